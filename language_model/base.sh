@@ -6,6 +6,10 @@ fi
 
 #PREPROCESSING
 VOCAB_SIZE=32000
+# Processes to encode each file with
+SPM_WORKERS=4
+# Lines sampled from the corpus to train each tokenizer on, 0 for all of them
+SPM_MAX_SENTENCES=5000000
 
 # GENERAL
 SEED=1234
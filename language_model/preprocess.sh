@@ -67,6 +67,9 @@ if [ ! -s "$source_model_file" ] || [ ! -s "$target_model_file" ]; then
             --model-prefix="$DIR/$set" \
             --vocab-size="$VOCAB_SIZE" \
             --model-type='bpe' \
+            --max-sentences="$SPM_MAX_SENTENCES" \
+            --dedupe \
+            --random-seed="$SEED" \
             || exit 1
         # Omitting special tokens <unk>, <s>, </s> replace all numbers in 2nd column with 100
         tail -n +4 "$DIR/${set}.vocab" | cut -f 1 | sed "s/$/ 100/g" > "$DIR/${set}.vocab.tmp"
@@ -88,6 +91,7 @@ for set in $SOURCE $TARGET; do
             --input="$file" \
             --output="$tokens_file" \
             --line-count="$line_count" \
+            --workers="$SPM_WORKERS" \
                 || exit 1
         fi
     done
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Align subtitle files with vector embeddings in a single process. Produces the same files as run_vecalign.sh, but the
+LASER encoder is only loaded once, so aligning many pairs with -p avoids paying for model startup on each of them.
+Given several targets, the source is read and embedded once and aligned with each of them.
+"""
+import argparse
+import sys
+
+from src.artifacts import ArtifactStore
+from src.config import Config
+from src.embedding_cache import EmbeddingCache, CachedEncoder, DEFAULT_MEMORY_SIZE
+from src.embedding_worker import WorkerEncoder
+from src.pipeline import align_pair, align_targets, output_files, get_encoder, ALIGNERS
+
+
+def read_pairs(filename):
+    pairs = []
+    with open(filename, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if len(line) == 0:
+                continue
+            source, *targets = line.split('\t')
+            pairs.append((source, targets))
+    return pairs
+
+
+def main(opts):
+    pairs = read_pairs(opts.pairs) if opts.pairs else [(opts.source, opts.target)]
+    encoder = WorkerEncoder(opts.worker) if opts.worker else get_encoder()
+    store = ArtifactStore(opts.artifacts, encoder.id) if opts.artifacts else None
+    if opts.cache:
+        encoder = CachedEncoder(encoder, EmbeddingCache(opts.cache, encoder.id, memory_size=opts.cache_memory))
+    for source, targets in pairs:
+        sys.stderr.write(f'source: {source}\n' + ''.join(f'target: {target}\n' for target in targets))
+        if len(targets) == 1:
+            align_pair(source, targets[0], encoder=encoder, write_files=True, by_partition=opts.by_partition,
+                       workers=opts.workers, aligner=opts.aligner,
+                       tolerance=opts.tolerance, store=store, partition=not opts.skip_partitioning)
+        else:
+            align_targets(source, targets, encoder=encoder, write_files=True, by_partition=opts.by_partition,
+                          workers=opts.workers, aligner=opts.aligner,
+                          tolerance=opts.tolerance, partition=not opts.skip_partitioning)
+        for target in targets:
+            for filename in output_files(source, target):
+                sys.stderr.write(filename + '\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--source', help='Source .srt file.')
+    parser.add_argument('-t', '--target', nargs='+', help='Target .srt files, one per language.')
+    parser.add_argument('-p', '--pairs', help='File with a tab separated source and one or more target .srt files '
+                                              'on each line.')
+    parser.add_argument('-w', '--worker', help='Socket of a running embedding_worker.py to embed with.')
+    parser.add_argument('-c', '--cache', help='Directory to cache embeddings in, shared across titles and with other '
+                                              'runs.')
+    parser.add_argument('--cache-memory', type=int, default=DEFAULT_MEMORY_SIZE,
+                        help='Cached embeddings to also keep in memory, about 4 KB each.')
+    parser.add_argument('--artifacts',
+                        help='Directory to keep sentences, embeddings and paths in, so realigning after fixing '
+                             'timecodes only repeats the work that depends on them.')
+    parser.add_argument('-a', '--aligner', choices=ALIGNERS, default='vecalign',
+                        help='vecalign needs the vecalign checkout, numpy uses the aligner in this repository.')
+    parser.add_argument('--tolerance', type=float,
+                        help='Only align sentences within this many seconds of each other. Needs -a numpy.')
+    parser.add_argument('--by-partition', action='store_true',
+                        help='Align each partition separately instead of the whole title as one sequence.')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='Processes to align partitions with, or targets when there are several.')
+    parser.add_argument('--skip-partitioning', action='store_true', default=not Config.ShouldPartitionByGaps,
+                        help='Extract sentences from the whole file instead of partitioning by gaps.')
+    args = parser.parse_args()
+    if args.pairs is None and (args.source is None or args.target is None):
+        parser.error("Either -p or both -s and -t are required.")
+    main(args)
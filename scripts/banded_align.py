@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+In-repo replacement for vecalign.py. Aligns two .sent files using the .overlap and .emb files sent2path.sh generates
+and writes the .path alignments to STDOUT.
+"""
+import argparse
+import os
+import sys
+
+from src.aligner import align, DEFAULT_BAND_WIDTH
+from src.config import Config
+from src.embeddings import read_embeddings, doc_embedding
+from src.helpers import get_ids_from_str, get_language_code_from_path
+from src.languages import Languages
+from src.pipeline import VECALIGN_NUM_OVERLAPS, path_lines
+from src.subtitle_table import SubtitleTable
+from src.timecode_band import sentence_spans, timecode_band
+
+
+def read_sentences(filename):
+    with open(filename, 'r', encoding='utf-8') as file:
+        return [line.strip() for line in file]
+
+
+def read_spans(sent_file):
+    """
+    Sentence timecodes from the .sent-index and .srt files next to a .sent file
+    """
+    srt_file = sent_file.replace('.sent', '.srt')
+    if not os.path.exists(srt_file):
+        srt_file += '.gz'
+    with open(sent_file.replace('.sent', '.sent-index'), 'r', encoding='utf-8') as file:
+        indices = [get_ids_from_str(line) for line in file]
+    language = Languages.get_language_name(get_language_code_from_path(srt_file))
+    return sentence_spans(indices, SubtitleTable.from_file(srt_file, language))
+
+
+def main(opts):
+    source_index, source_embeddings = read_embeddings(opts.src_embed[0], opts.src_embed[1])
+    target_index, target_embeddings = read_embeddings(opts.tgt_embed[0], opts.tgt_embed[1])
+    vecs0 = doc_embedding(source_index, source_embeddings, read_sentences(opts.src), opts.num_overlaps)
+    vecs1 = doc_embedding(target_index, target_embeddings, read_sentences(opts.tgt), opts.num_overlaps)
+    band = None
+    if opts.tolerance is not None:
+        band = timecode_band(*read_spans(opts.src), *read_spans(opts.tgt), tolerance=opts.tolerance)
+    path = align(vecs0, vecs1, alignment_max_size=opts.alignment_max_size, band=band, band_width=opts.band_width)
+    for line in path_lines(path):
+        sys.stdout.write(line + '\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--src', required=True, help='Source .sent file.')
+    parser.add_argument('-t', '--tgt', required=True, help='Target .sent file.')
+    parser.add_argument('--src_embed', nargs=2, required=True, help='Source .overlap and .emb files.')
+    parser.add_argument('--tgt_embed', nargs=2, required=True, help='Target .overlap and .emb files.')
+    parser.add_argument('-a', '--alignment_max_size', type=int, default=Config.AlignmentMaxSize)
+    parser.add_argument('-n', '--num_overlaps', type=int, default=VECALIGN_NUM_OVERLAPS)
+    parser.add_argument('-w', '--band_width', type=int, default=DEFAULT_BAND_WIDTH,
+                        help='Number of target sentences either side of the diagonal to consider.')
+    parser.add_argument('--tolerance', type=float,
+                        help='Search within this many seconds of each source sentence instead of around the diagonal. '
+                             'Needs the .sent-index and .srt files next to the .sent files.')
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Build and query a catalog of which titles have subtitles in which languages. Build it from the export.txt of the
+OpenSubtitles dump to explore language pairs before importing, or from an imported directory for
+corpus_generator.py --catalog. With -l, lists the titles having subtitles in all of the languages. With -c, prints
+how many titles each candidate language adds to the languages of -l, like find_lang_pairs.sh.
+"""
+import argparse
+import os
+import sys
+
+from src.catalog import Catalog
+from src.opensubtitles import ExportTable, EXPORT_FILE
+
+
+def main(opts):
+    catalog = Catalog(opts.database)
+    if opts.export:
+        catalog.add_export(ExportTable.from_file(os.path.join(opts.export, EXPORT_FILE)))
+    if opts.directory:
+        catalog.add_directory(opts.directory)
+    if opts.export or opts.directory or opts.rebuild:
+        catalog.rebuild()
+        sys.stderr.write(f'Catalog written to {opts.database}\n')
+
+    languages = opts.languages or []
+    if opts.combinations:
+        for lang in opts.combinations:
+            combination = languages + [lang]
+            print(f"{', '.join(combination)}: {catalog.count_having(combination, opts.year)}")
+    elif len(languages):
+        titles = catalog.titles_having(languages, opts.year)
+        for year, title in titles:
+            print(f'{year}/{title}')
+        sys.stderr.write(f"{len(titles)} titles have {', '.join(languages)}\n")
+    catalog.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--database', help='Catalog file. Defaults to catalog.db in $SUBTITLE_DATA.',
+                        default=os.path.join(os.environ.get('SUBTITLE_DATA', '.'), 'catalog.db'))
+    parser.add_argument('--export', help='Add the subtitles listed in export.txt in this directory.')
+    parser.add_argument('--directory', help='Add the subtitles imported into this directory.')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the language bitmaps of each title.')
+    parser.add_argument('-l', '--languages', nargs='+', help='Languages every title must have, e.g. eng spa ger.')
+    parser.add_argument('-c', '--combinations', nargs='+',
+                        help='Count titles having the languages of -l plus each of these in turn.')
+    parser.add_argument('-y', '--year', type=int, help='Only count titles of this year.')
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Align every title of a year directory (e.g. data/2024/Scream/eng) between two languages and collect the aligned
+sentences into all.<source> and all.<target> in that directory. Titles are aligned in parallel, each into its own
+shard, and a manifest keeps track of finished titles so rerunning after an interruption only aligns the rest. Shards
+are merged in title order once every title has been attempted.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+
+from src.catalog import Catalog
+from src.config import Config
+from src.corpus import Manifest, DONE, FAILED, write_shard, has_shard, merge_shards
+from src.embedding_worker import WorkerEncoder
+from src.pair_ranking import top_pairs, DEFAULT_TOP_K
+from src.pipeline import align_pair, aligned_sentences, get_encoder, ALIGNERS
+
+_encoder = None
+
+
+def _init_worker(worker_socket):
+    global _encoder
+    _encoder = WorkerEncoder(worker_socket) if worker_socket else None
+
+
+def titles_with_languages(directory, languages) -> [str]:
+    titles = []
+    for title in sorted(os.listdir(directory)):
+        title_dir = os.path.join(directory, title)
+        if not os.path.isdir(title_dir) or title.startswith('.'):
+            continue
+        missing = [lang for lang in languages if not os.path.isdir(os.path.join(title_dir, lang))]
+        if len(missing):
+            sys.stderr.write(f"{title} doesn't have support for {', '.join(missing)}\n")
+            continue
+        titles.append(title)
+    return titles
+
+
+def srt_files(title_dir, lang) -> [str]:
+    # Largest first, as the most complete subtitles tend to be the longest
+    return sorted(glob(os.path.join(title_dir, lang, '*.srt')), key=os.path.getsize, reverse=True)
+
+
+def candidate_pairs(title_dir, source_lang, target_lang, find_best, top_k=DEFAULT_TOP_K) -> [(str, str)]:
+    sources, targets = srt_files(title_dir, source_lang), srt_files(title_dir, target_lang)
+    if not find_best:
+        return [(source, target) for source in sources[:1] for target in targets[:1]]
+    # Rank every pair by its timecodes and only align the most promising ones
+    return top_pairs(sources, targets, top_k)
+
+
+def align_title(task) -> (str, str, int):
+    title, opts = task
+    title_dir = os.path.join(opts.directory, title)
+    try:
+        pairs = candidate_pairs(title_dir, opts.source_lang, opts.target_lang, opts.find_best, opts.top_k)
+        best = None
+        for source, target in pairs:
+            # Only write the usual vecalign files when there is nothing to choose between
+            path, source_doc, target_doc = align_pair(source, target, encoder=_encoder or get_encoder(),
+                                                      write_files=len(pairs) == 1, aligner=opts.aligner,
+                                                      partition=not opts.skip_partitioning)
+            aligned = aligned_sentences(path, source_doc, target_doc)
+            if best is None or len(aligned) > len(best):
+                best = aligned
+        if best is None:
+            return title, FAILED, 0
+        count = write_shard(opts.shard_dir, title, opts.source_lang, opts.target_lang, best)
+        return title, DONE, count
+    except Exception as e:
+        sys.stderr.write(f'Failed to align {title}: {e}\n')
+        return title, FAILED, 0
+
+
+def main(opts):
+    languages = (opts.source_lang, opts.target_lang)
+    opts.shard_dir = os.path.join(opts.directory, f'.corpus-{opts.source_lang}-{opts.target_lang}')
+    manifest = Manifest(os.path.join(opts.directory, f'corpus-{opts.source_lang}-{opts.target_lang}.manifest'))
+
+    if opts.catalog:
+        catalog = Catalog(opts.catalog)
+        year = os.path.basename(os.path.normpath(opts.directory))
+        titles = [title for _, title in catalog.titles_having(languages, int(year) if year.isdigit() else None)
+                  if os.path.isdir(os.path.join(opts.directory, title))]
+        catalog.close()
+    else:
+        titles = titles_with_languages(opts.directory, languages)
+    pending = [title for title in titles
+               if manifest.status(title) != DONE or not has_shard(opts.shard_dir, title, *languages)]
+    if not opts.retry_failed:
+        pending = [title for title in pending if manifest.status(title) != FAILED]
+    sys.stderr.write(f'{len(titles) - len(pending)} of {len(titles)} titles already attempted\n')
+
+    tasks = [(title, opts) for title in pending]
+    with ProcessPoolExecutor(opts.workers, initializer=_init_worker, initargs=(opts.worker,)) as executor:
+        futures = [executor.submit(align_title, task) for task in tasks]
+        for i, future in enumerate(as_completed(futures)):
+            title, status, count = future.result()
+            manifest.record(title, status, count)
+            sys.stderr.write(f'[{i + 1}/{len(tasks)}] {title}: {status}, {count} alignments\n')
+
+    done = [title for title in titles
+            if manifest.status(title) == DONE and has_shard(opts.shard_dir, title, *languages)]
+    total = merge_shards(opts.shard_dir, done, *languages,
+                         os.path.join(opts.directory, f'all.{opts.source_lang}'),
+                         os.path.join(opts.directory, f'all.{opts.target_lang}'))
+    sys.stderr.write(f'Merged {len(done)} titles, {total} lines\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory', help='Directory of one year of titles, each with a directory per language.')
+    parser.add_argument('source_lang', help='Source language code, e.g. eng.')
+    parser.add_argument('target_lang', help='Target language code, e.g. spa.')
+    parser.add_argument('-j', '--workers', type=int, default=4, help='Titles to align at once.')
+    parser.add_argument('-w', '--worker',
+                        help='Socket of a running embedding_worker.py. Otherwise every process loads its own encoder.')
+    parser.add_argument('-a', '--aligner', choices=ALIGNERS, default='vecalign')
+    parser.add_argument('--catalog', help='Catalog from catalog.py to find titles with both languages in, instead of '
+                                          'looking through the directory.')
+    parser.add_argument('--find-best', action='store_true',
+                        help='Rank every pair of files of a title by their timecodes, align the --top-k best and '
+                             'keep the one with the most alignments.')
+    parser.add_argument('-k', '--top-k', type=int, default=DEFAULT_TOP_K, help='Pairs to align with --find-best.')
+    parser.add_argument('--retry-failed', action='store_true', help='Align titles which failed in an earlier run.')
+    parser.add_argument('--skip-partitioning', action='store_true', default=not Config.ShouldPartitionByGaps,
+                        help='Extract sentences from the whole file instead of partitioning by gaps.')
+    args = parser.parse_args()
+    if not os.path.isdir(args.directory):
+        parser.error('You must provide the path to the directory of one of the years of films.')
+    main(args)
@@ -25,6 +25,7 @@ target_lang="$3"
 find_best="$4"
 
 stderrfile=/tmp/corpus_generator.err
+rankfile=/tmp/corpus_generator.rank
 corpus_source="$findpath/all.$source_lang"
 corpus_target="$findpath/all.$target_lang"
 if [ -s "$corpus_source" ]; then
@@ -68,32 +69,33 @@ run_best_alignments() {
     source_lang="$2"
     target_lang="$3"
     longest=
-    for source_file in $(all_srt_for "$dir" "$source_lang"); do
-        for target_file in $(all_srt_for "$dir" "$target_lang"); do
-            ./scripts/run_vecalign.sh "$source_file" "$target_file" 2> "$stderrfile" || continue
-            out_file="$dir/$source_lang-$target_lang-vecalign.txt"
-            # fix_offset also runs run_vecalign, so we should have the alignments file already
-            if [ -s "$out_file" ]; then
-                count=$(wc -l < "$out_file")
-                if [ -z "$longest" ] || [ "$count" -gt "$longest" ]; then
-                    echo "Longest alignments: $count" >&2
-                    longest="$count"
-                    keeper="${out_file//.txt/_keeper.txt}"
-                    cp "$out_file" "$keeper"
-                fi
+    # Rank every pair by their timecodes and only align the best few
+    ./scripts/rank_pairs.py -s $(all_srt_for "$dir" "$source_lang") -t $(all_srt_for "$dir" "$target_lang") \
+        -k "${TOP_K:-2}" > "$rankfile" || return 1
+    while IFS=$'\t' read -r score source_file target_file; do
+        ./scripts/run_vecalign.sh "$source_file" "$target_file" 2> "$stderrfile" || continue
+        out_file="$dir/$source_lang-$target_lang-vecalign.txt"
+        # fix_offset also runs run_vecalign, so we should have the alignments file already
+        if [ -s "$out_file" ]; then
+            count=$(wc -l < "$out_file")
+            if [ -z "$longest" ] || [ "$count" -gt "$longest" ]; then
+                echo "Longest alignments: $count" >&2
+                longest="$count"
+                keeper="${out_file//.txt/_keeper.txt}"
+                cp "$out_file" "$keeper"
+            fi
+        else
+            # If alignment fails, remove the output file
+            rm -f "$out_file"
+            if grep 'No module named' "$stderrfile"; then
+                echo "You need to activate the python environment" >&2
             else
-                # If alignment fails, remove the output file
-                rm -f "$out_file"
-                if grep 'No module named' "$stderrfile"; then
-                    echo "You need to activate the python environment" >&2
-                else
-                    echo "Error occurred running vecalign" >&2
-                    cat "$stderrfile"
-                fi
-                exit 1
+                echo "Error occurred running vecalign" >&2
+                cat "$stderrfile"
             fi
-        done
-    done
+            exit 1
+        fi
+    done < "$rankfile"
     mv "$keeper" "$out_file"
     cat "$out_file" >> "$corpus_source"
 }
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+"""
+Keep the LASER encoder loaded and serve embeddings over a Unix socket until interrupted. Point align_pair.py at it
+with -w so any number of alignment jobs share one encoder process.
+"""
+import argparse
+import sys
+import threading
+
+from src.embedding_worker import EmbeddingWorker, DEFAULT_BATCH_SIZE
+from src.pipeline import get_encoder
+
+
+def main(opts):
+    worker = EmbeddingWorker(get_encoder(), opts.socket, batch_size=opts.batch_size)
+    worker.start()
+    sys.stderr.write(f'Serving embeddings on {opts.socket}\n')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--socket', default='/tmp/seas-embedding.sock', help='Path of the Unix socket.')
+    parser.add_argument('-b', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Number of sentences to encode at once.')
+    args = parser.parse_args()
+    main(args)
@@ -2,6 +2,7 @@
 """
 Allows fixing a files timestamps to match the other
 """
+import gzip
 import os
 import subprocess
 import sys
@@ -9,16 +10,24 @@ import sys
 from regex import regex
 
 from src.alignments import Alignments
+from src.artifacts import ArtifactStore
 from src.film import Film
-from src.helpers import get_text, get_language_code_from_path
+from src.helpers import get_language_code_from_path
+from src.pipeline import align_pair
 from src.subtitles import Subtitles
 
 
 def run_vecalign(opts):
-    subprocess.check_output(['./scripts/run_vecalign.sh', opts.source, opts.target, '--skip-partitioning', '>&2'])
+    if opts.artifacts:
+        # Align in this process so the sentences and embeddings are kept for realigning after the fix
+        align_pair(opts.source, opts.target, write_files=True, store=ArtifactStore(opts.artifacts), partition=False)
+    else:
+        subprocess.check_output(['./scripts/run_vecalign.sh', opts.source, opts.target, '--skip-partitioning', '>&2'])
 
 
 def sent_files_for_srt(srt_file) -> (str, str):
+    # Gzipped subtitles get plain text outputs next to them
+    srt_file = srt_file.removesuffix('.gz')
     return srt_file.replace('.srt', '.sent'), srt_file.replace('.srt', '.sent-index')
 
 
@@ -28,7 +37,7 @@ def alignment_files(source, target) -> (str, str):
     and a path to the index file
     """
     # See if these files are splits
-    match = regex.match(r'\d{4,10}(-\d{3}).srt$', source.split('/')[-1])
+    match = regex.match(r'\d{4,10}(-\d{3}).srt$', source.removesuffix('.gz').split('/')[-1])
     suffix = ''
     if match is not None and len(match.groups()) > 0:
         suffix = match.group(1)
@@ -42,7 +51,8 @@ def alignment_files(source, target) -> (str, str):
 def delay_and_save(filename, subs, offset):
     for sub in subs:
         sub.delay_timecodes(offset)
-    with open(filename, 'w') as f:
+    # Gzipped subtitles stay gzipped so they can still be read
+    with (gzip.open(filename, 'wt', encoding='utf-8') if filename.endswith('.gz') else open(filename, 'w')) as f:
         # Write the source subs
         for sub in subs:
             f.write(sub.lines + '\n\n')
@@ -51,12 +61,9 @@ def delay_and_save(filename, subs, offset):
 
 
 def fix_offset(opts, film, offset):
-    source_text = get_text(opts.source)
-    target_text = get_text(opts.target)
-
-    # Create Subtitle objects from the file texts
-    source_subs = Subtitles(source_text, language=get_language_code_from_path(opts.source), is_source=True)
-    target_subs = Subtitles(target_text, language=get_language_code_from_path(opts.target), is_source=False)
+    # Create Subtitle objects from the files
+    source_subs = Subtitles.from_file(opts.source, language=get_language_code_from_path(opts.source), is_source=True)
+    target_subs = Subtitles.from_file(opts.target, language=get_language_code_from_path(opts.target), is_source=False)
 
     # We won't ever advance subtitles, only delay them
     if offset > 0:
@@ -70,6 +77,9 @@ def main(opts, film: Film):
     if offset > opts.tolerance * 1e6:
         sys.stderr.write(f'Calculated offset of {offset} is greater than {opts.tolerance}.\n')
         fix_offset(opts, film, offset)
+        if opts.artifacts:
+            # Only text that reads differently after the fix has to be embedded again
+            run_vecalign(opts)
     else:
         sys.stderr.write(f'Calculated offset of {offset} is not greater than {opts.tolerance}\n')
 
@@ -80,6 +90,9 @@ if __name__ == '__main__':
     parser.add_argument('-s', '--source', required=True, help='Source subtitle file.')
     parser.add_argument('-t', '--target', required=True, help='Target subtitle file.')
     parser.add_argument('--tolerance', default=2, type=float, help='Seconds to allow before correcting.')
+    parser.add_argument('--artifacts',
+                        help='Directory to keep sentences, embeddings and paths in. Aligns in this process and '
+                             'realigns once the timecodes are fixed.')
 
     args = parser.parse_args()
 
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Convert the sharded OpenSubtitles dump (e.g. files/2/3/4/3/154923432.gz) into YEAR/TITLE/LANGCODE/154923432.srt with
+an info.txt for each title, like import_from_opensubtitles.sh. export.txt is read once, and the subtitles of every
+selected year and language are decompressed in parallel. Files which were already imported are skipped, so an
+interrupted import can simply be run again.
+"""
+import argparse
+import os
+import sys
+from multiprocessing import Pool
+
+from tqdm import tqdm
+
+from src.opensubtitles import ExportTable, EXPORT_FILE, extract, shard_path
+
+
+def main(opts):
+    table = ExportTable.from_file(os.path.join(opts.data, EXPORT_FILE))
+    rows = table.select(opts.first_year, opts.last_year, opts.languages)
+    sys.stderr.write(f'{len(rows)} of {len(table)} subtitles selected\n')
+
+    files_dir = os.path.join(opts.data, 'files')
+    tasks = [(shard_path(files_dir, table.ids[row]), table.destination(opts.output, row)) for row in rows.tolist()]
+    # The last subtitle of a title describes it, as in import_from_opensubtitles.sh
+    infos = {table.title_dir(opts.output, row): table.info(row) for row in rows.tolist()}
+
+    failures = 0
+    with Pool(opts.workers) as pool:
+        for _, error in tqdm(pool.imap_unordered(extract, tasks, chunksize=64), total=len(tasks)):
+            if error is not None:
+                failures += 1
+                tqdm.write(error, file=sys.stderr)
+    for title_dir, info in infos.items():
+        if os.path.isdir(title_dir):
+            with open(os.path.join(title_dir, 'info.txt'), 'w', encoding='utf-8') as file:
+                file.write(info)
+    sys.stderr.write(f'Imported {len(tasks) - failures} subtitles of {len(infos)} titles into {opts.output}\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--data', default=os.environ.get('SUBTITLE_DATA'),
+                        help='Directory of the dump with export.txt and files/. Defaults to $SUBTITLE_DATA.')
+    parser.add_argument('-o', '--output', help='Directory to import into. Defaults to processed/ in --data.')
+    parser.add_argument('-y', '--year', type=int, help='Only import this year.')
+    parser.add_argument('--first-year', type=int, help='Only import this year and later.')
+    parser.add_argument('--last-year', type=int, help='Only import this year and earlier.')
+    parser.add_argument('-l', '--languages', nargs='+', help='Only import these language codes, e.g. eng spa.')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='Processes to decompress with.')
+    args = parser.parse_args()
+    if args.data is None:
+        parser.error('Pass --data or set the SUBTITLE_DATA environment variable.')
+    if args.year is not None:
+        args.first_year = args.last_year = args.year
+    args.output = args.output or os.path.join(args.data, 'processed')
+    main(args)
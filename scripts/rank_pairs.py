@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+"""
+Rank pairs of subtitle files of the same title by how well they are likely to align, using only their timecodes:
+the ratio of subtitle counts, the ratio of durations and how much they overlap once offset and frame rate drift are
+corrected. Prints the pairs best first as tab separated lines of score, source file and target file.
+"""
+import argparse
+import sys
+
+from src.pair_ranking import rank_pairs
+
+
+def main(opts):
+    ranked = rank_pairs(opts.source, opts.target)
+    if opts.top_k:
+        ranked = ranked[:opts.top_k]
+    for pair_score in ranked:
+        if opts.verbose:
+            sys.stderr.write(repr(pair_score) + '\n')
+        print(f'{pair_score.score:.4f}\t{pair_score.source_srt}\t{pair_score.target_srt}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--source', nargs='+', required=True, help='Source .srt files.')
+    parser.add_argument('-t', '--target', nargs='+', required=True, help='Target .srt files.')
+    parser.add_argument('-k', '--top-k', type=int, help='Only print this many pairs.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print each signal to stderr.')
+    args = parser.parse_args()
+    main(args)
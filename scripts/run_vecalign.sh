@@ -17,14 +17,17 @@ target_lang=$(dirname "$target" | awk -F/ '{print $NF}')
 # Check for suffixes from partitioning subtitles
 suffix=''
 if [[ "$source" =~ .+-[0-9]{3}.srt ]]; then
-    suffix=-$(echo "$source" | awk -F/ '{print $NF}' | sed s/\.srt//g | cut -d- -f2)
+    suffix=-$(echo "${source%.gz}" | awk -F/ '{print $NF}' | sed s/\.srt//g | cut -d- -f2)
 fi
 echo "source: $source" >&2
 echo "target: $target" >&2
 echo "Detecting $source_lang --> $target_lang in Dir: $base_dirname" >&2
 
-source_sent="${source/.srt/.sent}"
-target_sent="${target/.srt/.sent}"
+# Gzipped subtitles get plain text sentence files next to them
+source_sent="${source%.gz}"
+source_sent="${source_sent/.srt/.sent}"
+target_sent="${target%.gz}"
+target_sent="${target_sent/.srt/.sent}"
 path_file="$base_dirname/${source_lang}-${target_lang}-vecalign${suffix}.path"
 alignments_file="$base_dirname/${source_lang}-${target_lang}-vecalign${suffix}.txt"
 
@@ -29,7 +29,7 @@ def get_subtitles(contents, language, is_source) -> [Subtitle]:
         subtitles.append(current)
         if previous is not None:
             current.previous = previous
-            previous.following = current
+            previous.subsequent = current
         previous = current
     return subtitles
 
@@ -3,91 +3,24 @@
 Extract sentences from SRT file after preprocessing. Writes to STDOUT.
 """
 import argparse
-import os
 import sys
-import regex
 
 from src.config import Config
-from src.helpers import get_text, find_partitions, collate_subs, find_partitions_by_gap_size, merge_ellipsized
 from src.languages import Languages
-from src.subtitle import sterilize
-from src.subtitles import Subtitles
+from src.pipeline import extract_documents
 
 
-def layer(lines, num_overlaps, comb=' '):
-    out = []
-    for ii in range(len(lines) - num_overlaps + 1):
-        out.append(comb.join(lines[ii:ii + num_overlaps]))
-    return out
-
-
-def yield_overlaps(lines, num_overlaps):
-    for overlap in range(1, num_overlaps + 1):
-        for out_line in layer(lines, overlap):
-            yield out_line
-
-
-def close_files(files):
-    for file in files:
-        file.close()
-
-
-def open_associated_files(srt_filename) -> (str, str, str):
-    return (open(srt_filename.replace('.srt', '.sent'), 'w', encoding='utf-8'),
-            open(srt_filename.replace('.srt', '.sent-index'), 'w', encoding='utf-8'),
-            open(srt_filename.replace('.srt', '.overlap'), 'w', encoding='utf-8'))
-
 def get_language_from_file(srt_filename):
     return Languages.get_language_name(srt_filename.split('/')[-2])
 
 def main(opts):
     sys.stderr.write(f'Overlap size: {opts.num_overlaps}, Gap length: {opts.gap_length}' + '\n')
-    source_text = get_text(opts.source)
-    target_text = get_text(opts.target)
-
-    source_subs = Subtitles(source_text, get_language_from_file(opts.source), is_source=True)
-    target_subs = Subtitles(target_text, get_language_from_file(opts.target), is_source=False)
-
-    source_sent_file, source_index_file, source_overlap_file = open_associated_files(opts.source)
-    target_sent_file, target_index_file, target_overlap_file = open_associated_files(opts.target)
-
-    collated = collate_subs(source_subs.subtitles, target_subs.subtitles)
-    partitions = find_partitions_by_gap_size(collated, opts.gap_length)
-    if Config.MergeEllipsized > 0:
-        partitions = merge_ellipsized(partitions, Config.MergeEllipsized)
-
-    source_overlaps = set()
-    target_overlaps = set()
-
-    for partition in partitions:
-        for utterance in partition.source.utterances:
-            source_sent_file.write(utterance.text + '\n')
-            if opts.index:
-                source_index_file.write(str(sorted([sub.index for sub in utterance.subtitles])) + '\n')
-
-        for utterance in partition.target.utterances:
-            target_sent_file.write(utterance.text + '\n')
-            if opts.index:
-                target_index_file.write(str(sorted([sub.index for sub in utterance.subtitles])) + '\n')
-
-        for line in yield_overlaps([u.text for u in partition.source.utterances], opts.num_overlaps):
-            source_overlaps.add(line)
-
-        for line in yield_overlaps([u.text for u in partition.target.utterances], opts.num_overlaps):
-            target_overlaps.add(line)
-
-    source_overlaps = list(source_overlaps)
-    source_overlaps.sort()
-    for line in source_overlaps:
-        source_overlap_file.write(line + '\n')
-
-    target_overlaps = list(target_overlaps)
-    target_overlaps.sort()
-    for line in target_overlaps:
-        target_overlap_file.write(line + '\n')
-
-    close_files([source_sent_file, source_index_file, source_overlap_file,
-                 target_sent_file, target_index_file, target_overlap_file])
+    source, target = extract_documents(opts.source, opts.target,
+                                       source_language=get_language_from_file(opts.source),
+                                       target_language=get_language_from_file(opts.target),
+                                       num_overlaps=opts.num_overlaps, gap_length=opts.gap_length, partition=True)
+    source.write(index=opts.index)
+    target.write(index=opts.index)
 
 
 if __name__ == '__main__':
@@ -5,7 +5,6 @@ Extract sentences from SRT file after preprocessing. Writes to STDOUT.
 import argparse
 import os
 
-from src.helpers import get_text
 from src.languages import Languages
 from src.subtitles import Subtitles
 
@@ -18,10 +17,11 @@ def with_file(filename, opts):
     file = os.path.expanduser(filename)
     if not os.path.exists(file):
         raise (Exception(f"File path does not exist: {file}"))
-    text = get_text(file)
-    subtitles = Subtitles(text, language=language)
-    sent_file = file.replace('.srt', '.sent')
-    index_file = file.replace('.srt', '.sent-index')
+    subtitles = Subtitles.from_file(file, language=language)
+    # Gzipped subtitles get plain text outputs next to them
+    base = file.removesuffix('.gz')
+    sent_file = base.replace('.srt', '.sent')
+    index_file = base.replace('.srt', '.sent-index')
     output = open(sent_file, 'w', encoding='utf-8')
     index_output = open(index_file, 'w', encoding='utf-8')
     for utterance in subtitles.utterances:
@@ -40,7 +40,7 @@ def with_dir(opts):
     for root, dirs, files in os.walk(directory):
         for file in files:
             file = os.path.join(root, file)
-            if file.lower().endswith('.srt'):
+            if file.lower().endswith(('.srt', '.srt.gz')):
                 with_file(file, opts)
 
 
@@ -6,37 +6,167 @@
 # OR
 # spm_encode
 #   --model=[model_path] --input=[input_file] --output=[output_file] ...
+#
+# Lines are encoded --batch-size at a time. With --workers N and an --input
+# file, the file is split into N ranges of bytes at line boundaries which are
+# encoded in parallel and written out in their original order.
+#
+# --binary (with --output-format id) writes little endian int32 values instead
+# of text. Each line is its number of fields followed by the length and ids of
+# each field. See read_ids.
 ################################################################################
 import argparse
-import sentencepiece as spm
+import os
+import shutil
 import sys
+import tempfile
+from multiprocessing import Pool
+
+import numpy as np
+import sentencepiece as spm
 from tqdm import tqdm
 
+BINARY_DTYPE = np.dtype('<i4')
+
+
 def load_spm(existing_model, random_seed=None):
     if random_seed is not None:
         spm.set_random_generator_seed(random_seed)
     return spm.SentencePieceProcessor(model_file=existing_model)
 
+def open_file(path, mode, binary):
+    return open(path, mode + 'b') if binary else open(path, mode, encoding='utf-8')
+
 def read_file(path):
     with open(path, encoding='utf-8') as f:
         yield from f
 
+def read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode('utf-8')
+
+def shard_offsets(path, workers):
+    # Move each split forward to the start of the next line so no line is divided between shards
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, workers):
+            f.seek(max(size * i // workers - 1, offsets[-1]))
+            f.readline()
+            offsets.append(min(f.tell(), size))
+    offsets.append(size)
+    return [(start, end) for start, end in zip(offsets, offsets[1:]) if end > start]
+
+def batches(lines, batch_size):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if len(batch):
+        yield batch
+
+def encode_options(args):
+    # Plain values, so they can be sent to worker processes unlike args with its stdin and stdout
+    return dict(output_format=args.output_format, binary=args.binary, batch_size=args.batch_size,
+                enable_sampling=args.enable_sampling, alpha=args.alpha)
+
+def encode_batch(processor, lines, options):
+    # Encode every field of every line in one call and regroup them by line afterwards
+    fields = [line.strip().split("\t") for line in lines]
+    flat = [field for line_fields in fields for field in line_fields]
+    out_type = str if options['output_format'] == "piece" else int
+    tokens = processor.encode(flat, out_type=out_type, enable_sampling=options['enable_sampling'],
+                              alpha=options['alpha'])
+    encoded = []
+    i = 0
+    for line_fields in fields:
+        encoded.append(tokens[i:i + len(line_fields)])
+        i += len(line_fields)
+    return encoded
+
+def write_text(output_file, encoded):
+    for line_fields in encoded:
+        output_file.write("\t".join(" ".join([str(t) for t in tokens]) for tokens in line_fields) + "\n")
+
+def write_binary(output_file, encoded):
+    values = []
+    for line_fields in encoded:
+        values.append(len(line_fields))
+        for tokens in line_fields:
+            values.append(len(tokens))
+            values.extend(tokens)
+    output_file.write(np.array(values, dtype=BINARY_DTYPE).tobytes())
+
+def read_ids(path):
+    # Generates the fields of each line of a file written with --binary, as lists of ids
+    values = np.fromfile(path, dtype=BINARY_DTYPE)
+    i = 0
+    while i < len(values):
+        num_fields = values[i]
+        i += 1
+        fields = []
+        for _ in range(num_fields):
+            length = values[i]
+            fields.append(values[i + 1:i + 1 + length].tolist())
+            i += 1 + length
+        yield fields
+
+def encode_lines(processor, lines, output_file, options, progress=None):
+    write = write_binary if options['binary'] else write_text
+    for batch in batches(lines, options['batch_size']):
+        write(output_file, encode_batch(processor, batch, options))
+        if progress is not None:
+            progress.update(len(batch))
+
+def encode_shard(task):
+    model, input_path, seed, options, start, end, part_file = task
+    processor = load_spm(model, seed)
+    with open_file(part_file, 'w', options['binary']) as f:
+        encode_lines(processor, read_range(input_path, start, end), f, options)
+    return part_file
+
+def encode_parallel(model, input_path, workers, random_seed, options, output_file):
+    shards = shard_offsets(input_path, workers)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Offset the seed so sampled shards don't all draw the same segmentations
+        tasks = [(model, input_path, None if random_seed is None else random_seed + i, options, start, end,
+                  os.path.join(tmp_dir, f'{i}.part')) for i, (start, end) in enumerate(shards)]
+        with Pool(workers) as pool:
+            for part_file in tqdm(pool.imap(encode_shard, tasks), total=len(tasks), unit='shard'):
+                with open_file(part_file, 'r', options['binary']) as part:
+                    shutil.copyfileobj(part, output_file)
+                os.remove(part_file)
+
 def main(args):
-    processor = load_spm(args.model, args.random_seed)
-    input_file = read_file(args.input) if type(args.input) == str else args.input
-    output_file = open(args.output, 'w', encoding='utf-8') if type(args.output) == str else args.output
-
-    out_type = str if args.output_format == "piece" else int
-
-    if args.line_count == 0:
-        sys.stderr.write("Pass --line_count for progress bar." + "\n")
-    for line in tqdm(input_file, total=args.line_count):
-        fields = line.strip().split("\t")
-        out_fields = []
-        for field in fields:
-            tokens = processor.encode(field, out_type=out_type, enable_sampling=args.enable_sampling, alpha=args.alpha)
-            out_fields.append(" ".join([str(t) for t in tokens]))
-        output_file.write("\t".join(out_fields) + "\n")
+    if args.binary and args.output_format != "id":
+        sys.stderr.write("--binary needs --output-format id" + "\n")
+        exit(1)
+    if args.binary and type(args.output) != str:
+        output_file = sys.stdout.buffer
+    elif type(args.output) == str:
+        output_file = open_file(args.output, 'w', args.binary)
+    else:
+        output_file = args.output
+
+    options = encode_options(args)
+    if args.workers > 1 and type(args.input) == str:
+        encode_parallel(args.model, args.input, args.workers, args.random_seed, options, output_file)
+    else:
+        if args.workers > 1:
+            sys.stderr.write("--workers needs --input, encoding in a single process." + "\n")
+        processor = load_spm(args.model, args.random_seed)
+        input_file = read_file(args.input) if type(args.input) == str else args.input
+        if args.line_count == 0:
+            sys.stderr.write("Pass --line_count for progress bar." + "\n")
+        with tqdm(total=args.line_count) as progress:
+            encode_lines(processor, input_file, output_file, options, progress)
     if type(args.output) == str:
         output_file.close()
 
@@ -46,8 +176,11 @@ if __name__ == "__main__":
     parser.add_argument("--input", type=str, required=False, default=sys.stdin)
     parser.add_argument("--output", type=str, required=False, default=sys.stdout)
     parser.add_argument("--output-format", type=str, default="piece", choices=["id", "piece"])
+    parser.add_argument("--binary", action="store_true", help="Write ids as int32 instead of text.")
     parser.add_argument("--alpha", type=float, default=0.5)
     parser.add_argument("--enable-sampling", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=1024, help="Lines to encode per call.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes to encode an --input file with.")
     # line count is for tqdm
     parser.add_argument("--line-count", type=int, default=0)
     parser.add_argument("--random-seed", type=int, required=False)
@@ -8,17 +8,96 @@
 #   --character_coverage="${CHAR_COV}"
 #   --model_type="${MODEL_TYPE}"
 #   --shuffle_input_sentence=true
+#
+# Lines are stripped and filtered by length before they reach the trainer. The
+# default limits only drop blank lines and lines the trainer would skip anyway.
+# With --dedupe, repeated lines are dropped using a Bloom filter of a fixed size
+# (--dedupe-mb), which also drops a small share of distinct lines once it fills
+# up. With --max-sentences, a uniform sample of that many lines is kept in a
+# reservoir while the corpus streams by. Together, memory is bounded by the
+# filter and the reservoir rather than growing with corpus size.
 ################################################################################
 
 import argparse
-import sentencepiece as spm
+import hashlib
+import random
+import resource
 import sys
+import time
+
+import sentencepiece as spm
 
 
 def data_iter(path):
     with open(path, "r", encoding='utf-8') as f:
         yield from f
 
+class BloomFilter:
+    def __init__(self, size_mb=64, num_hashes=4):
+        self.bits = bytearray(size_mb * 1024 * 1024)
+        self.num_bits = len(self.bits) * 8
+        self.num_hashes = num_hashes
+
+    def add(self, line):
+        """
+        Returns whether the line may have been added before, and adds it
+        """
+        digest = hashlib.blake2b(line.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        seen = True
+        for i in range(self.num_hashes):
+            bit = (h1 + i * h2) % self.num_bits
+            if not self.bits[bit >> 3] & (1 << (bit & 7)):
+                seen = False
+                self.bits[bit >> 3] |= 1 << (bit & 7)
+        return seen
+
+class SentenceSampler:
+    def __init__(self, max_sentences=0, min_length=1, max_length=4192, random_seed=None, dedupe_mb=0):
+        self.max_sentences = max_sentences
+        self.min_length = min_length
+        self.max_length = max_length
+        self.random = random.Random(random_seed)
+        self.read = 0
+        self.filtered = 0
+        self.duplicates = 0
+        self.kept = 0
+        self._seen = BloomFilter(dedupe_mb) if dedupe_mb > 0 else None
+
+    def _unique(self, lines):
+        for line in lines:
+            self.read += 1
+            line = line.strip()
+            if not self.min_length <= len(line) <= self.max_length:
+                self.filtered += 1
+                continue
+            if self._seen is not None and self._seen.add(line):
+                self.duplicates += 1
+                continue
+            yield line
+
+    def sample(self, lines):
+        if self.max_sentences <= 0:
+            for line in self._unique(lines):
+                self.kept += 1
+                yield line
+            return
+        reservoir = []
+        for i, line in enumerate(self._unique(lines)):
+            if i < self.max_sentences:
+                reservoir.append(line)
+            else:
+                j = self.random.randint(0, i)
+                if j < self.max_sentences:
+                    reservoir[j] = line
+        self.kept = len(reservoir)
+        yield from reservoir
+
+def max_memory_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes elsewhere
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
 def train_spm(model_prefix, train_iter, vocab_size, character_coverage, model_type, byte_fallback, random_seed=None, user_defined_symbols=""):
     if random_seed is not None:
         spm.set_random_generator_seed(random_seed)
@@ -35,7 +114,10 @@ def train_spm(model_prefix, train_iter, vocab_size, character_coverage, model_ty
     return spm.SentencePieceProcessor(model_file=model_prefix + ".model")
 
 def main(args):
-    sentences = data_iter(args.input)
+    started = time.time()
+    sampler = SentenceSampler(args.max_sentences, args.min_length, args.max_length, args.random_seed,
+                              args.dedupe_mb if args.dedupe else 0)
+    sentences = sampler.sample(data_iter(args.input))
     processor = train_spm(
         args.model_prefix,
         sentences,
@@ -46,7 +128,10 @@ def main(args):
         random_seed=args.random_seed,
         user_defined_symbols=args.user_defined_symbols
     )
-    sys.stderr.write(f'Vocab model written to: {args.model_prefix}.model')
+    sys.stderr.write(f'Vocab model written to: {args.model_prefix}.model\n')
+    sys.stderr.write(f'Read {sampler.read} lines: {sampler.filtered} filtered by length, '
+                     f'{sampler.duplicates} duplicates, {sampler.kept} used for training\n')
+    sys.stderr.write(f'Took {time.time() - started:.1f} seconds, max memory {max_memory_mb():.0f} MB\n')
 
 
 if __name__ == "__main__":
@@ -59,5 +144,13 @@ if __name__ == "__main__":
     parser.add_argument("--byte-fallback", action="store_true", default=False)
     parser.add_argument("--random-seed", type=int, required=False)
     parser.add_argument("--user-defined-symbols", type=str, default="")
+    parser.add_argument("--max-sentences", type=int, default=0,
+                        help="Train on a random sample of this many lines. 0 uses all of them.")
+    parser.add_argument("--dedupe", action="store_true", default=False, help="Skip repeated lines.")
+    parser.add_argument("--dedupe-mb", type=int, default=64,
+                        help="Memory for finding repeated lines. More lets fewer distinct lines be mistaken for "
+                             "repeats.")
+    parser.add_argument("--min-length", type=int, default=1, help="Skip lines with fewer characters.")
+    parser.add_argument("--max-length", type=int, default=4192, help="Skip lines with more characters.")
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,146 @@
+from math import ceil
+
+import numpy as np
+
+from src.config import Config
+
+DEFAULT_BAND_WIDTH = 20
+DEFAULT_DEL_PERCENTILE_FRAC = 0.2
+DEFAULT_NUM_SAMPLES = 100
+DEFAULT_COSTS_SAMPLE_SIZE = 2000
+
+
+def alignment_types(alignment_max_size, num_overlaps) -> [(int, int)]:
+    """
+    Deletions, insertions and every many-to-many alignment with at most alignment_max_size sentences in total.
+    Neither side can be longer than the overlaps which were embedded.
+    """
+    types = [(0, 1), (1, 0)]
+    for x in range(1, num_overlaps + 1):
+        for y in range(1, num_overlaps + 1):
+            if x + y <= alignment_max_size:
+                types.append((x, y))
+    return types
+
+
+def diagonal_band(num_source, num_target, width=DEFAULT_BAND_WIDTH) -> (np.ndarray, np.ndarray):
+    """
+    Admissible target positions for each source position, centred on the diagonal
+    :return: lows and highs (exclusive) of the band for each of the num_source + 1 rows of the DP
+    """
+    # Consecutive rows have to overlap for the corner to be reachable
+    width = max(width, ceil(num_target / max(num_source, 1)))
+    centres = np.arange(num_source + 1) * (num_target / max(num_source, 1))
+    lows = np.clip(np.floor(centres).astype(np.int64) - width, 0, num_target)
+    highs = np.clip(np.ceil(centres).astype(np.int64) + width + 1, 1, num_target + 1)
+    lows[0], highs[-1] = 0, num_target + 1
+    return lows, highs
+
+
+def _normalize(vecs) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+    return vecs / np.where(norms == 0, 1, norms)
+
+
+class _Costs:
+    """
+    Cost of aligning x source sentences with y target sentences, as in vecalign: one minus the cosine similarity of
+    the two overlap embeddings, scaled by the number of sentences on each side and normalized by how similar each
+    embedding is to random sentences from the other document.
+    """
+
+    def __init__(self, vecs0, vecs1, num_samples, rng):
+        self.vecs0 = _normalize(vecs0.astype(np.float32, copy=False))
+        self.vecs1 = _normalize(vecs1.astype(np.float32, copy=False))
+        samples1 = self.vecs1[0, rng.integers(self.vecs1.shape[1], size=num_samples)]
+        samples0 = self.vecs0[0, rng.integers(self.vecs0.shape[1], size=num_samples)]
+        self.norms0 = (1 - self.vecs0 @ samples1.T).mean(axis=-1)
+        self.norms1 = (1 - self.vecs1 @ samples0.T).mean(axis=-1)
+
+    def __call__(self, x, y, source_ends, target_ends) -> np.ndarray:
+        """
+        :param source_ends: last source sentence of each alignment to cost, or one for all of them
+        :param target_ends: last target sentence of each alignment to cost
+        """
+        source = self.vecs0[x - 1, source_ends]
+        target = self.vecs1[y - 1, target_ends]
+        similarity = target @ source if source.ndim == 1 else (target * source).sum(axis=-1)
+        normalizer = (self.norms0[x - 1, source_ends] + self.norms1[y - 1, target_ends]) / 2
+        return np.maximum(1 - similarity, 0) * x * y / np.maximum(normalizer, 1e-6)
+
+
+def align(vecs0, vecs1, alignment_max_size=Config.AlignmentMaxSize, band=None, band_width=DEFAULT_BAND_WIDTH,
+          del_percentile_frac=DEFAULT_DEL_PERCENTILE_FRAC, num_samples=DEFAULT_NUM_SAMPLES,
+          costs_sample_size=DEFAULT_COSTS_SAMPLE_SIZE, seed=0) -> [([int], [int], float)]:
+    """
+    Many-to-many sentence alignment with dynamic programming over a band around the diagonal, using the stacked
+    overlap embeddings from embeddings.doc_embedding
+    :param vecs0: (num_overlaps, num_source, dim) source embeddings
+    :param vecs1: (num_overlaps, num_target, dim) target embeddings
+    :param band: lows and highs of admissible target positions for each DP row, diagonal_band() when not given
+    :param del_percentile_frac: deleting a sentence costs this percentile of the one-to-one alignment costs
+    :return: the alignment path as (source sentence ids, target sentence ids, cost), the same as vecalign's output
+    """
+    num_source, num_target = vecs0.shape[1], vecs1.shape[1]
+    if num_source == 0 or num_target == 0:
+        return [([i], [], 0.0) for i in range(num_source)] + [([], [j], 0.0) for j in range(num_target)]
+
+    rng = np.random.default_rng(seed)
+    costs = _Costs(vecs0, vecs1, min(num_samples, num_source, num_target), rng)
+    types = alignment_types(alignment_max_size, min(vecs0.shape[0], vecs1.shape[0]))
+    lows, highs = band if band is not None else diagonal_band(num_source, num_target, band_width)
+    width = int((highs - lows).max())
+
+    # Deletion penalty from a sample of one-to-one costs inside the band
+    rows = rng.integers(1, num_source + 1, size=costs_sample_size)
+    cols = rng.integers(lows[rows], highs[rows])
+    cols = np.clip(cols, 1, num_target)
+    del_penalty = float(np.percentile(costs(1, 1, rows - 1, cols - 1), 100 * del_percentile_frac))
+
+    # Row i of the DP only stores target positions lows[i] to highs[i]
+    distances = np.full((num_source + 1, width), np.inf)
+    backpointers = np.full((num_source + 1, width), -1, dtype=np.int8)
+    horizontal = types.index((0, 1))
+
+    for i in range(num_source + 1):
+        js = np.arange(lows[i], highs[i])
+        best = np.full(len(js), np.inf)
+        best_type = np.full(len(js), -1, dtype=np.int8)
+        if i == 0:
+            best[js == 0] = 0
+        for k, (x, y) in enumerate(types):
+            if x == 0 or i < x:
+                continue
+            previous = i - x
+            starts = js - y
+            valid = (starts >= lows[previous]) & (starts < highs[previous]) & (starts >= 0)
+            if not valid.any():
+                continue
+            candidates = np.full(len(js), np.inf)
+            candidates[valid] = distances[previous, starts[valid] - lows[previous]]
+            if y == 0:
+                candidates[valid] += del_penalty
+            else:
+                # Overlap embeddings are indexed by the last sentence of each run
+                candidates[valid] += costs(x, y, i - 1, js[valid] - 1)
+            better = candidates < best
+            best[better] = candidates[better]
+            best_type[better] = k
+        # Insertions of target sentences depend on the cell to the left, which a running minimum resolves at once
+        shifted = best - js * del_penalty
+        running = np.minimum.accumulate(shifted)
+        distances[i, :len(js)] = running + js * del_penalty
+        backpointers[i, :len(js)] = np.where(shifted <= running, best_type, horizontal)
+
+    if not np.isfinite(distances[num_source, num_target - lows[num_source]]):
+        raise (Exception("The alignment band does not connect the start and end of the documents"))
+
+    path = []
+    i, j = num_source, num_target
+    while i > 0 or j > 0:
+        x, y = types[backpointers[i, j - lows[i]]]
+        cost = distances[i, j - lows[i]] - distances[i - x, j - y - lows[i - x]]
+        path.append((list(range(i - x, i)), list(range(j - y, j)), float(cost)))
+        i, j = i - x, j - y
+    path.reverse()
+    return path
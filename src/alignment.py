@@ -9,14 +9,47 @@ class Alignment:
         self.target_ids = [i for x in target_sub_ids for i in x]
 
         # Set externally
-        self.source_subs = []
-        self.target_subs = []
+        self._source_subs = []
+        self._target_subs = []
+
+        # Span of source and target subtitles, computed on first use
+        self._span = None
+
+    @property
+    def source_subs(self):
+        return self._source_subs
+
+    @source_subs.setter
+    def source_subs(self, subtitles):
+        self._source_subs = subtitles
+        self._span = None
+
+    @property
+    def target_subs(self):
+        return self._target_subs
+
+    @target_subs.setter
+    def target_subs(self, subtitles):
+        self._target_subs = subtitles
+        self._span = None
+
+    def invalidate_span(self):
+        """
+        Forget the cached span. Needed after changing the subtitle lists in place or delaying their timecodes.
+        """
+        self._span = None
+
+    def _get_span(self) -> (int, int):
+        if self._span is None:
+            subtitles = self._source_subs + self._target_subs
+            self._span = (min([sub.start for sub in subtitles]), max([sub.end for sub in subtitles]))
+        return self._span
 
     def start(self) -> int:
-        return min([sub.start for sub in (self.source_subs + self.target_subs)])
+        return self._get_span()[0]
 
     def end(self) -> int:
-        return max([sub.end for sub in (self.source_subs + self.target_subs)])
+        return self._get_span()[1]
 
     def __str__(self):
         return f'{self.source} <-> {self.target}'
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import pickle
+
+from src.config import Config
+from src.embedding_cache import EmbeddingCache
+from src.helpers import read_srt_blocks
+
+
+def file_key(srt_file) -> str:
+    """
+    Hash of the subtitles in a file, which ignores compression, line endings and Byte Order Marks
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for block in read_srt_blocks(srt_file):
+        hasher.update(block.encode('utf-8'))
+        hasher.update(b'\n\n')
+    return hasher.hexdigest()
+
+
+def combine_keys(*parts) -> str:
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def config_key() -> str:
+    return combine_keys(sorted((name, value) for name, value in vars(Config).items() if not name.startswith('_')))
+
+
+class ArtifactStore:
+    """
+    ArtifactStore keeps what aligning a title produces, keyed by hashes of everything it was computed from.
+    Embeddings are keyed by the text they embed, so after timecodes change only new sentences and overlaps are
+    embedded again while partitioning and the DP run over the new timecodes.
+    """
+
+    def __init__(self, directory, encoder_id='laser2'):
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.embeddings = EmbeddingCache(os.path.join(self.directory, 'embeddings'), encoder_id)
+
+    def _path(self, kind, key) -> str:
+        return os.path.join(self.directory, f'{kind}-{key}.pickle')
+
+    def load(self, kind, key):
+        """
+        :return: the artifact, or None if it hasn't been saved
+        """
+        path = self._path(kind, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+    def save(self, kind, key, value):
+        path = self._path(kind, key)
+        # Write to a temporary file first so an interrupted run never leaves a partial artifact behind
+        with open(path + '.tmp', 'wb') as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
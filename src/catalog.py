@@ -0,0 +1,144 @@
+import os
+import sqlite3
+from glob import glob
+
+import numpy as np
+
+from src.opensubtitles import ExportTable, clean_title
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subtitles (
+    id INTEGER PRIMARY KEY,
+    year INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    path TEXT
+);
+CREATE INDEX IF NOT EXISTS subtitles_title ON subtitles (title, year);
+CREATE INDEX IF NOT EXISTS subtitles_lang ON subtitles (lang, title);
+CREATE INDEX IF NOT EXISTS subtitles_year ON subtitles (year);
+CREATE TABLE IF NOT EXISTS languages (
+    bit INTEGER PRIMARY KEY,
+    lang TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS titles (
+    id INTEGER PRIMARY KEY,
+    year INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    languages BLOB NOT NULL,
+    UNIQUE (year, title)
+);
+"""
+
+
+class Catalog:
+    """
+    Catalog is a SQLite database of which subtitles exist for each title and language. Besides the indexed
+    subtitles table, each title has a bitmap of its languages so questions like "which titles have all of eng, spa
+    and ger" are answered from memory without scanning subtitles. Titles are named like their directories
+    in the imported layout, YEAR/TITLE.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(SCHEMA)
+        self._bitmaps = None
+
+    def add(self, rows: [(int, int, str, str, str)]):
+        """
+        :param rows: id, year, title, language code and path of each subtitle. Ids which exist already are replaced.
+        """
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO subtitles (id, year, title, lang, path) '
+                                        'VALUES (?, ?, ?, ?, ?)', rows)
+        self._bitmaps = None
+
+    def add_export(self, table: ExportTable, rows=None):
+        """
+        Catalog subtitles listed in the export.txt of the dump, before they are imported
+        :param rows: rows of the table to add, e.g. from ExportTable.select. Defaults to all of them.
+        """
+        rows = table.select() if rows is None else rows
+        self.add((int(table.ids[row]), int(table.years[row]), clean_title(table.titles[row]),
+                  table.languages[row], None) for row in rows.tolist())
+
+    def add_directory(self, directory):
+        """
+        Catalog subtitles imported into directory/YEAR/TITLE/LANGCODE/ID.srt
+        """
+        rows = []
+        for path in glob(os.path.join(directory, '*', '*', '*', '*.srt')):
+            lang_dir = os.path.dirname(path)
+            title_dir = os.path.dirname(lang_dir)
+            year, title = os.path.basename(os.path.dirname(title_dir)), os.path.basename(title_dir)
+            subtitle_id = os.path.basename(path).split('.')[0]
+            if not year.isdigit() or not subtitle_id.isdigit():
+                continue
+            rows.append((int(subtitle_id), int(year), title, os.path.basename(lang_dir), path))
+        self.add(rows)
+
+    def rebuild(self):
+        """
+        Rebuild the language bitmaps of every title from the subtitles table. Call after adding subtitles.
+        """
+        with self.connection:
+            self.connection.execute('DELETE FROM languages')
+            self.connection.execute('DELETE FROM titles')
+            # The most common languages get the lowest bits, which keeps bitmaps short
+            languages = [lang for lang, in self.connection.execute(
+                'SELECT lang FROM subtitles GROUP BY lang ORDER BY count(DISTINCT title || year) DESC, lang')]
+            self.connection.executemany('INSERT INTO languages (bit, lang) VALUES (?, ?)', enumerate(languages))
+            bits = {lang: bit for bit, lang in enumerate(languages)}
+            num_bytes = max((len(languages) + 7) // 8, 1)
+
+            bitmaps = {}
+            for year, title, lang in self.connection.execute('SELECT DISTINCT year, title, lang FROM subtitles'):
+                bitmap = bitmaps.setdefault((year, title), np.zeros(num_bytes, dtype=np.uint8))
+                bitmap[bits[lang] // 8] |= 1 << (bits[lang] % 8)
+            self.connection.executemany('INSERT INTO titles (year, title, languages) VALUES (?, ?, ?)',
+                                        ((year, title, bitmap.tobytes())
+                                         for (year, title), bitmap in sorted(bitmaps.items())))
+        self._bitmaps = None
+
+    def _load_bitmaps(self):
+        if self._bitmaps is None:
+            bits = dict(self.connection.execute('SELECT lang, bit FROM languages'))
+            rows = self.connection.execute('SELECT year, title, languages FROM titles ORDER BY year, title').fetchall()
+            num_bytes = max((len(bits) + 7) // 8, 1)
+            matrix = np.zeros((len(rows), num_bytes), dtype=np.uint8)
+            for i, (_, _, bitmap) in enumerate(rows):
+                matrix[i, :len(bitmap)] = np.frombuffer(bitmap, dtype=np.uint8)
+            years = np.array([year for year, _, _ in rows], dtype=np.int64)
+            self._bitmaps = (bits, matrix, years, [title for _, title, _ in rows])
+        return self._bitmaps
+
+    def _having(self, languages, year=None) -> np.ndarray:
+        bits, matrix, years, _ = self._load_bitmaps()
+        if any(lang not in bits for lang in languages):
+            return np.zeros(0, dtype=np.int64)
+        mask = np.zeros(matrix.shape[1], dtype=np.uint8)
+        for lang in languages:
+            mask[bits[lang] // 8] |= 1 << (bits[lang] % 8)
+        matches = np.all((matrix & mask) == mask, axis=1)
+        if year is not None:
+            matches &= years == year
+        return np.flatnonzero(matches)
+
+    def titles_having(self, languages, year=None) -> [(int, str)]:
+        """
+        :return: year and title of every title with subtitles in all of the languages, sorted
+        """
+        _, _, years, titles = self._load_bitmaps()
+        return [(int(years[i]), titles[i]) for i in self._having(languages, year).tolist()]
+
+    def count_having(self, languages, year=None) -> int:
+        return len(self._having(languages, year))
+
+    def files(self, year, title, lang) -> [str]:
+        return [path for path, in self.connection.execute(
+            'SELECT path FROM subtitles WHERE title = ? AND year = ? AND lang = ? AND path IS NOT NULL ORDER BY id',
+            (title, year, lang))]
+
+    def close(self):
+        self.connection.close()
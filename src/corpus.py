@@ -0,0 +1,85 @@
+import os
+
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Manifest:
+    """
+    Manifest records the outcome of each title of a corpus in a tab separated file, one line per title as it
+    finishes, so an interrupted run can pick up where it stopped. Later lines override earlier ones.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.statuses = {}
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as file:
+                for line in file:
+                    fields = line.rstrip('\n').split('\t')
+                    # A run killed mid write can leave a partial last line
+                    if len(fields) != 3 or not fields[2].isdigit():
+                        continue
+                    title, status, count = fields
+                    self.statuses[title] = (status, int(count))
+
+    def record(self, title, status, count=0):
+        self.statuses[title] = (status, count)
+        with open(self.filename, 'a', encoding='utf-8') as file:
+            file.write(f'{title}\t{status}\t{count}\n')
+
+    def status(self, title) -> str:
+        """
+        :return: the last status recorded for the title, or None
+        """
+        return self.statuses[title][0] if title in self.statuses else None
+
+    def count(self, title) -> int:
+        return self.statuses[title][1] if title in self.statuses else 0
+
+
+def shard_files(shard_dir, title, source_lang, target_lang) -> (str, str):
+    return os.path.join(shard_dir, f'{title}.{source_lang}'), os.path.join(shard_dir, f'{title}.{target_lang}')
+
+
+def write_shard(shard_dir, title, source_lang, target_lang, pairs: [(str, str)]) -> int:
+    """
+    Write the aligned sentences of one title, a line per sentence in each language
+    :return: number of lines written
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    for side, filename in enumerate(shard_files(shard_dir, title, source_lang, target_lang)):
+        # Renamed into place so a shard is either complete or missing
+        with open(filename + '.tmp', 'w', encoding='utf-8') as file:
+            for pair in pairs:
+                file.write(pair[side].replace('\n', ' ') + '\n')
+        os.replace(filename + '.tmp', filename)
+    return len(pairs)
+
+
+def has_shard(shard_dir, title, source_lang, target_lang) -> bool:
+    return all(os.path.exists(filename) for filename in shard_files(shard_dir, title, source_lang, target_lang))
+
+
+def merge_shards(shard_dir, titles, source_lang, target_lang, source_file, target_file) -> int:
+    """
+    Concatenate the shards of the titles, in the order given, into one file per language
+    :return: number of lines in each file
+    """
+    total = 0
+    with open(source_file + '.tmp', 'w', encoding='utf-8') as source, \
+            open(target_file + '.tmp', 'w', encoding='utf-8') as target:
+        for title in titles:
+            source_shard, target_shard = shard_files(shard_dir, title, source_lang, target_lang)
+            with open(source_shard, 'r', encoding='utf-8') as file:
+                lines = file.readlines()
+            with open(target_shard, 'r', encoding='utf-8') as file:
+                target_lines = file.readlines()
+            if len(lines) != len(target_lines):
+                raise (Exception(f'Shards of {title} have {len(lines)} and {len(target_lines)} lines'))
+            source.writelines(lines)
+            target.writelines(target_lines)
+            total += len(lines)
+    os.replace(source_file + '.tmp', source_file)
+    os.replace(target_file + '.tmp', target_file)
+    return total
@@ -0,0 +1,190 @@
+import fcntl
+import hashlib
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+EMBEDDING_DIM = 1024
+# Vectors kept in memory by each process, about 40 MB at 1024 dimensions
+DEFAULT_MEMORY_SIZE = 10000
+
+
+def normalize(text) -> str:
+    return ' '.join(text.split())
+
+
+def text_key(text) -> int:
+    """
+    :return: 64-bit hash of the normalized text
+    """
+    digest = hashlib.blake2b(normalize(text).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class _Store:
+    """
+    Append-only file of float32 vectors with a companion file of the 64-bit text keys for each row. Processes sharing
+    a store lock the keys file while writing, and first pick up the rows others appended so every row stays where the
+    keys file says it is.
+    """
+
+    def __init__(self, path, dim):
+        self.vectors_file = path + '.f32'
+        self.keys_file = path + '.keys'
+        self.dim = dim
+        self.count = 0
+        self.rows = {}
+        self._vectors = None
+        with self._locked():
+            self._sync()
+
+    @contextmanager
+    def _locked(self):
+        with open(self.keys_file, 'ab') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _sync(self):
+        """
+        Drop anything left over from a write that was interrupted between the two files, and read the keys of rows
+        appended since this store last looked. Only call while holding the lock.
+        """
+        row_bytes = 4 * self.dim
+        vector_rows = os.path.getsize(self.vectors_file) // row_bytes if os.path.exists(self.vectors_file) else 0
+        total = min(os.path.getsize(self.keys_file) // 8, vector_rows)
+        if os.path.getsize(self.keys_file) > total * 8:
+            os.truncate(self.keys_file, total * 8)
+        if os.path.exists(self.vectors_file) and os.path.getsize(self.vectors_file) > total * row_bytes:
+            os.truncate(self.vectors_file, total * row_bytes)
+        if total > self.count:
+            keys = np.fromfile(self.keys_file, dtype='<u8', count=total - self.count, offset=self.count * 8)
+            self.rows.update(zip(keys.tolist(), range(self.count, total)))
+            self.count = total
+
+    def refresh(self):
+        """
+        Pick up rows other processes appended
+        """
+        with self._locked():
+            self._sync()
+
+    def vector(self, row) -> np.ndarray:
+        if self._vectors is None or len(self._vectors) < self.count:
+            self._vectors = np.memmap(self.vectors_file, dtype=np.float32, mode='r', shape=(self.count, self.dim))
+        return np.array(self._vectors[row])
+
+    def append(self, keys, vectors):
+        with self._locked():
+            self._sync()
+            # Another process may have added some of them in the meantime
+            new = [i for i, key in enumerate(keys) if key not in self.rows]
+            if not len(new):
+                return
+            with open(self.vectors_file, 'ab') as file:
+                file.write(np.ascontiguousarray(np.asarray(vectors)[new], dtype='<f4').tobytes())
+            with open(self.keys_file, 'ab') as file:
+                file.write(np.asarray([keys[i] for i in new], dtype='<u8').tobytes())
+            for i in new:
+                self.rows[keys[i]] = self.count
+                self.count += 1
+
+
+class EmbeddingCache:
+    """
+    EmbeddingCache keeps sentence embeddings on disk so each distinct line is only ever embedded once per encoder
+    and language, no matter how many titles it appears in. Entries are keyed by a hash of the normalized text.
+    Vectors are read through a memory map and the most recently used ones are also kept in memory. Several
+    processes can share a cache directory.
+    """
+
+    def __init__(self, directory, encoder_id, dim=EMBEDDING_DIM, memory_size=DEFAULT_MEMORY_SIZE):
+        """
+        :param directory: root of the cache, with one subdirectory per encoder
+        :param memory_size: number of vectors to keep in memory
+        """
+        self.directory = os.path.join(os.path.expanduser(directory), encoder_id)
+        os.makedirs(self.directory, exist_ok=True)
+        self.encoder_id = encoder_id
+        self.dim = dim
+        self.memory_size = memory_size
+        self._stores = {}
+        self._recent = OrderedDict()
+
+    def _store(self, language) -> _Store:
+        if language not in self._stores:
+            self._stores[language] = _Store(os.path.join(self.directory, language), self.dim)
+        return self._stores[language]
+
+    def _remember(self, cache_key, vector):
+        self._recent[cache_key] = vector
+        if len(self._recent) > self.memory_size:
+            self._recent.popitem(last=False)
+
+    def get(self, language, key):
+        """
+        :param key: from text_key()
+        :return: the cached vector or None
+        """
+        cache_key = (language, key)
+        vector = self._recent.get(cache_key)
+        if vector is not None:
+            self._recent.move_to_end(cache_key)
+            return vector
+        store = self._store(language)
+        row = store.rows.get(key)
+        if row is None:
+            return None
+        vector = store.vector(row)
+        self._remember(cache_key, vector)
+        return vector
+
+    def add(self, language, keys, vectors):
+        store = self._store(language)
+        new = [i for i, key in enumerate(keys) if key not in store.rows]
+        if len(new):
+            store.append([keys[i] for i in new], np.asarray(vectors, dtype=np.float32)[new])
+
+    def encode(self, encoder, texts: [str], language) -> np.ndarray:
+        """
+        Embed texts, only passing the ones which aren't cached yet on to the encoder
+        :return: float32 array with one row per text
+        """
+        keys = [text_key(text) for text in texts]
+        embeddings = np.empty((len(texts), self.dim), dtype=np.float32)
+        missing = OrderedDict()
+        for i, key in enumerate(keys):
+            vector = self.get(language, key)
+            if vector is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                embeddings[i] = vector
+
+        if len(missing):
+            # Other processes sharing the cache may have embedded some of them since
+            self._store(language).refresh()
+            for key in list(missing):
+                vector = self.get(language, key)
+                if vector is not None:
+                    embeddings[missing.pop(key)] = vector
+        if len(missing):
+            vectors = encoder.encode([texts[rows[0]] for rows in missing.values()], language)
+            self.add(language, list(missing.keys()), vectors)
+            for vector, (key, rows) in zip(vectors, missing.items()):
+                embeddings[rows] = vector
+                self._remember((language, key), np.array(vector, dtype=np.float32))
+        return embeddings
+
+
+class CachedEncoder:
+    """
+    Drop-in replacement for an Encoder which consults an EmbeddingCache first
+    """
+
+    def __init__(self, encoder, cache: EmbeddingCache):
+        self.encoder = encoder
+        self.cache = cache
+
+    def encode(self, sentences: [str], language=None) -> np.ndarray:
+        return self.cache.encode(self.encoder, sentences, language or 'any')
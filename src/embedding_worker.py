@@ -0,0 +1,211 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+from src.embedding_cache import EMBEDDING_DIM
+
+HEADER = struct.Struct('>I')
+DEFAULT_BATCH_SIZE = 128
+# How long to wait for other jobs to fill a batch, in seconds
+DEFAULT_MAX_WAIT = 0.01
+
+
+def send_frame(sock, payload: bytes):
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def recv_frame(sock) -> bytes:
+    """
+    :return: the payload, or None when the other side closed the connection
+    """
+    header = _recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    return _recv_exactly(sock, HEADER.unpack(header)[0])
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+class _Job:
+    __slots__ = ('sentences', 'language', 'embeddings', 'error', 'done')
+
+    def __init__(self, sentences, language):
+        self.sentences = sentences
+        self.language = language
+        self.embeddings = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingWorker:
+    """
+    EmbeddingWorker holds one encoder in memory and serves embeddings over a Unix socket, so many alignment jobs
+    can share it without each loading the model. Requests which arrive together are merged and sorted by length
+    before encoding, which keeps padding within each batch low.
+    """
+
+    def __init__(self, encoder, socket_path, batch_size=DEFAULT_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT):
+        self.encoder = encoder
+        self.socket_path = socket_path
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.jobs = queue.Queue()
+        self.server = None
+        self._thread = None
+
+    def encode(self, sentences: [str], language=None) -> np.ndarray:
+        """
+        Queue sentences to be encoded with those of other connections and wait for the result
+        """
+        job = _Job(sentences, language)
+        self.jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.embeddings
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            jobs = [job]
+            count = len(job.sentences)
+            deadline = time.monotonic() + self.max_wait
+            while count < self.batch_size:
+                try:
+                    job = self.jobs.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is None:
+                    self.jobs.put(None)
+                    break
+                jobs.append(job)
+                count += len(job.sentences)
+            self._encode_jobs(jobs)
+
+    def _encode_jobs(self, jobs):
+        languages = {}
+        for job in jobs:
+            languages.setdefault(job.language, []).append(job)
+        for language, language_jobs in languages.items():
+            try:
+                self._encode_language(language, language_jobs)
+            except Exception as e:
+                for job in language_jobs:
+                    job.error = e
+            for job in language_jobs:
+                job.done.set()
+
+    def _encode_language(self, language, jobs):
+        entries = [(len(sentence), j, i) for j, job in enumerate(jobs) for i, sentence in enumerate(job.sentences)]
+        entries.sort()
+        dim = None
+        for start in range(0, len(entries), self.batch_size):
+            batch = entries[start:start + self.batch_size]
+            vectors = np.asarray(self.encoder.encode([jobs[j].sentences[i] for _, j, i in batch], language),
+                                 dtype=np.float32)
+            if dim is None:
+                dim = vectors.shape[1]
+                for job in jobs:
+                    job.embeddings = np.zeros((len(job.sentences), dim), dtype=np.float32)
+            for vector, (_, j, i) in zip(vectors, batch):
+                jobs[j].embeddings[i] = vector
+        if dim is None:
+            for job in jobs:
+                job.embeddings = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+    def _remove_stale_socket(self):
+        """
+        Remove a socket left behind by a worker which is no longer running, but never take one over from a live worker
+        """
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise (Exception(f"Another embedding worker is already serving on {self.socket_path}"))
+
+    def start(self):
+        """
+        Start serving in background threads
+        """
+        worker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                while True:
+                    payload = recv_frame(self.request)
+                    if payload is None:
+                        return
+                    request = json.loads(payload.decode('utf-8'))
+                    try:
+                        embeddings = worker.encode(request['sentences'], request.get('language'))
+                    except Exception as e:
+                        send_frame(self.request, json.dumps({'error': str(e)}).encode('utf-8'))
+                        continue
+                    header = {'rows': embeddings.shape[0], 'dim': embeddings.shape[1]}
+                    send_frame(self.request, json.dumps(header).encode('utf-8'))
+                    send_frame(self.request, np.ascontiguousarray(embeddings, dtype='<f4').tobytes())
+
+        if os.path.exists(self.socket_path):
+            self._remove_stale_socket()
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.jobs.put(None)
+        self._thread.join()
+        if os.path.exists(self.socket_path):
+            self._remove_stale_socket()
+
+
+class WorkerEncoder:
+    """
+    Drop-in replacement for an Encoder which sends sentences to an EmbeddingWorker
+    """
+
+    def __init__(self, socket_path, encoder_id='laser2'):
+        self.id = encoder_id
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(socket_path)
+
+    def encode(self, sentences: [str], language=None) -> np.ndarray:
+        request = {'sentences': list(sentences), 'language': language}
+        send_frame(self.socket, json.dumps(request).encode('utf-8'))
+        header = recv_frame(self.socket)
+        if header is None:
+            raise (Exception("Embedding worker closed the connection"))
+        header = json.loads(header.decode('utf-8'))
+        if 'error' in header:
+            raise (Exception(f"Embedding worker failed: {header['error']}"))
+        body = recv_frame(self.socket)
+        return np.frombuffer(body, dtype='<f4').reshape(header['rows'], header['dim']).astype(np.float32)
+
+    def close(self):
+        self.socket.close()
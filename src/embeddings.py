@@ -0,0 +1,94 @@
+import numpy as np
+
+from src.embedding_cache import EMBEDDING_DIM, text_key
+from src.overlap_spans import span_keys
+
+
+def load_embeddings(emb_file, dim=EMBEDDING_DIM) -> np.ndarray:
+    """
+    Memory-map an .emb file written by LASER's embed.sh. Rows are only read from disk when they're used.
+    :return: read-only (n, dim) float32 view of the file
+    """
+    return np.memmap(emb_file, dtype=np.float32, mode='r').reshape(-1, dim)
+
+
+class OverlapIndex:
+    """
+    OverlapIndex maps overlap lines to their rows in an .emb file. Only a sorted array of 64-bit text hashes and
+    the matching rows are kept, instead of a dict holding every line as a Python string.
+    """
+
+    def __init__(self, lines: [str]):
+        self._set_keys(np.fromiter((text_key(line) for line in lines), dtype=np.uint64, count=len(lines)))
+
+    def _set_keys(self, keys):
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    @classmethod
+    def from_keys(cls, keys) -> "OverlapIndex":
+        """
+        :param keys: text keys of each row, such as OverlapSpans.keys
+        """
+        index = cls([])
+        index._set_keys(np.asarray(keys, dtype=np.uint64))
+        return index
+
+    @classmethod
+    def from_file(cls, overlap_file) -> "OverlapIndex":
+        with open(overlap_file, 'r', encoding='utf-8') as file:
+            return cls([line.strip() for line in file])
+
+    def rows(self, lines: [str]) -> np.ndarray:
+        """
+        :return: row of each line, or -1 for lines which aren't in the index
+        """
+        return self.rows_for_keys(np.fromiter((text_key(line) for line in lines), dtype=np.uint64, count=len(lines)))
+
+    def rows_for_keys(self, keys) -> np.ndarray:
+        keys = np.asarray(keys, dtype=np.uint64)
+        if len(self.keys) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[positions] == keys, self.order[positions], -1)
+
+    def row(self, line) -> int:
+        return int(self.rows([line])[0])
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def read_embeddings(overlap_file, emb_file, dim=EMBEDDING_DIM) -> (OverlapIndex, np.ndarray):
+    """
+    Zero-copy replacement for vecalign's read_in_embeddings
+    """
+    embeddings = load_embeddings(emb_file, dim)
+    index = OverlapIndex.from_file(overlap_file)
+    if len(index) != len(embeddings):
+        raise (Exception(f"{overlap_file} has {len(index)} lines but {emb_file} has {len(embeddings)} embeddings"))
+    return index, embeddings
+
+
+def doc_embedding(index: OverlapIndex, embeddings, sentences: [str], num_overlaps) -> np.ndarray:
+    """
+    Same as vecalign's make_doc_embedding: stack the embedding of every run of 1 to num_overlaps consecutive
+    sentences, indexed by the last sentence of the run. Like vecalign's layer(), the first min(overlap - 1, n) slots
+    of each overlap are padding, and they get a random unit vector as do runs without an embedding, like those
+    spanning two partitions.
+    :return: (num_overlaps, len(sentences), dim) float32 array
+    """
+    dim = embeddings.shape[1]
+    vecs = np.empty((num_overlaps, len(sentences), dim), dtype=np.float32)
+    keys = span_keys(sentences, num_overlaps)
+    for i in range(num_overlaps):
+        pad = min(i, len(sentences))
+        rows = np.full(len(sentences), -1, dtype=np.int64)
+        rows[pad:] = index.rows_for_keys(keys[i, :len(sentences) - pad])
+        found = rows >= 0
+        vecs[i, found] = embeddings[rows[found]]
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            random = np.random.random((len(missing), dim)) - 0.5
+            vecs[i, missing] = random / np.linalg.norm(random, axis=1, keepdims=True)
+    return vecs
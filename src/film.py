@@ -2,7 +2,6 @@ import sys
 
 from src.alignments import Alignments
 from src.annotation import Annotation
-from src.helpers import get_text
 from src.subtitles import Subtitles
 import copy
 
@@ -13,8 +12,7 @@ class Film:
             self.is_source = is_source
             self.label = srt_file.split('/')[-1].split('.')[0]
             self.language_code = srt_file.split('/')[-2]
-            text = get_text(srt_file)
-            self.subtitles = Subtitles(text, self.language_code, is_source).subtitles
+            self.subtitles = Subtitles.from_file(srt_file, self.language_code, is_source).subtitles
 
     def __init__(self, source_file, target_file, alignments: Alignments, ignore_stranded=False):
         self.source = Film.Language(source_file, is_source=True)
@@ -1,4 +1,5 @@
 import copy
+import gzip
 import os
 import string
 
@@ -7,6 +8,7 @@ import regex
 import sys
 
 from src.alignment import Alignment
+from src.interval_index import IntervalIndex
 from src.partition import Partition
 from src.utterance import Utterance
 
@@ -27,6 +29,59 @@ def get_text(filename):
     return srt_text.replace('\ufeff', '')  # Removing Byte Order Mark
 
 
+def read_srt_blocks(filename):
+    """
+    Stream the subtitle blocks of an SRT file, optionally gzipped, without reading the whole file into memory.
+    Blocks are split on blank lines with carriage returns and Byte Order Marks removed, like get_text and Subtitles.
+    If a line isn't valid UTF-8, it and everything after it is decoded as Latin-1.
+    :param filename: path to an .srt or .srt.gz file
+    :return: generator of subtitle blocks, each being the lines of one subtitle joined with newlines
+    """
+    file = os.path.expanduser(filename)
+    if not os.path.exists(file):
+        raise (Exception(f"File path does not exist: {file}"))
+    opener = gzip.open if file.endswith('.gz') else open
+
+    def _blocks():
+        encoding = 'utf-8'
+        block = []
+        with opener(file, 'rb') as srt_file:
+            for raw_line in srt_file:
+                try:
+                    text = raw_line.decode(encoding)
+                except UnicodeDecodeError as _:
+                    sys.stderr.write(f'UTF-8 decoding failed. Using Latin-1.' + '\n')
+                    encoding = 'latin-1'
+                    text = raw_line.decode(encoding)
+                # Universal newlines, as when reading in text mode
+                lines = text.replace('\ufeff', '').replace('\r\n', '\n').replace('\r', '\n').split('\n')
+                if text.endswith('\n'):
+                    lines.pop()
+                for line in lines:
+                    if len(line) > 0:
+                        block.append(line)
+                    elif len(block) > 0:
+                        yield '\n'.join(block)
+                        block = []
+        if len(block) > 0:
+            yield '\n'.join(block)
+
+    # Strip leading whitespace from the first block and trailing whitespace from the last
+    blocks = _blocks()
+    previous = ''
+    while previous is not None and len(previous) == 0:
+        previous = next(blocks, None)
+        previous = previous.lstrip() if previous is not None else None
+    if previous is None:
+        return
+    for content in blocks:
+        yield previous
+        previous = content
+    previous = previous.rstrip()
+    if len(previous) > 0:
+        yield previous
+
+
 def get_ids_from_str(id_string):
     ids = regex.findall(r'\d+', id_string)
     return [int(i) for i in ids]
@@ -113,27 +168,32 @@ def find_in_range(subtitles, start, end):
     """
     Find all subtitles in a given time range and return them in a list
     Does not necessarily return subtitles linked
+    :param subtitles: a list of subtitles or an IntervalIndex built from them
     """
+    if isinstance(subtitles, IntervalIndex):
+        return subtitles.find(start, end)
     return [subtitle for subtitle in subtitles if subtitle.end > start and subtitle.start < end]
 
 
 def find_all(subtitles, start, end):
     """
     Find all subtitles and subtitles they're linked to in a given time range and return them in a list
+    :param subtitles: a list of subtitles or an IntervalIndex built from them
     """
+    if not isinstance(subtitles, IntervalIndex):
+        subtitles = IntervalIndex(subtitles)
     stack = find_in_range(subtitles, start, end)
-    searched = []
-    found = set()
+    # Subtitles compare equal by timestring, so source and target subtitles sharing timecodes
+    # would collapse into one. Track them by identity instead.
+    searched = set(id(subtitle) for subtitle in stack)
+    found = []
     while len(stack) > 0:
         subtitle = stack.pop()
-        searched.append(subtitle)
-        found.add(subtitle)
-        for subtitle in find_in_range(subtitles, subtitle.start, subtitle.end):
-            if subtitle not in searched:
-                stack.append(subtitle)
-        for adj in subtitle.linked_via_utterance():
-            if adj not in searched:
-                stack.append(adj)
+        found.append(subtitle)
+        for related in find_in_range(subtitles, subtitle.start, subtitle.end) + subtitle.linked_via_utterance():
+            if id(related) not in searched:
+                searched.add(id(related))
+                stack.append(related)
     return found
 
 
@@ -171,18 +231,18 @@ def find_partitions(collated) -> [Partition]:
     :returns: a list of partitions
     """
     partitions = []
-    index = 0
-    current_partition = None
+    index = IntervalIndex(collated)
+    partitioned = set()
 
-    while len(collated) > 0:
-        current_partition = Partition(index)
-        index += 1
+    for subtitle in collated:
+        if id(subtitle) in partitioned:
+            continue
+        current_partition = Partition(len(partitions))
         partitions.append(current_partition)
-        subtitle = collated[0]
         current_partition.append(subtitle)
-        for related in find_all(collated, subtitle.start, subtitle.end):
-            if related in collated:
-                collated.remove(related)
+        partitioned.add(id(subtitle))
+        for related in find_all(index, subtitle.start, subtitle.end):
+            partitioned.add(id(related))
             current_partition.append(related)
 
     return partitions
@@ -191,36 +251,36 @@ def find_partitions(collated) -> [Partition]:
 def find_partitions_by_gap_size(collated, gap_length):
     """
     Partition collated subtitles between gaps of certain length
+    :param collated: a list of subtitles in source and target langs sorted by subtitle.start
+    :param gap_length: gap length in seconds
+    :returns: a list of partitions, including the section after the last gap
     """
-    sections = []
-    gaps = []
-    last_gap = 0
-    last_start = 0
-    previous = None
-    # First find the gaps
-    for subtitle in collated:
-        if previous is not None:
-            last_gap = subtitle.start - previous.end
-        if last_gap >= gap_length * 1e6:
-            gaps.append(last_gap)
-            # Get the length of the time between gaps, not the length of the gap
-            length = previous.end - last_start
-            sections.append({'length': length, 'start': last_start, 'end': previous.end, 'gap': last_gap})
-            last_start = subtitle.start
-        previous = subtitle
 
-    # Now use the time ranges to gather the subtitles
-    partitions = []
-    index = 0
-    for section in sections:
+    def _close(index, source, target, last) -> Partition:
+        # Each side is sorted and measured once, rather than on every append
         partition = Partition(index)
-        index += 1
-        for sub in find_in_range(collated, section['start'], section['end']):
-            sub.utterances = set()  # clear utterances generated by Subtitles class
-            partition.append(sub)
-        partitions.append(partition)
+        partition.source.subtitles = sorted(source, key=lambda sub: sub.start)
+        partition.target.subtitles = sorted(target, key=lambda sub: sub.start)
+        # Same span Partition.append leaves behind: that of the side the last subtitle was on
+        side = partition.source if last.is_source else partition.target
+        partition.start, partition.end = side.subtitles[0].start, max(sub.end for sub in side.subtitles)
         partition.source.utterances += find_utterances(partition.source.subtitles)
         partition.target.utterances += find_utterances(partition.target.subtitles)
+        return partition
+
+    partitions = []
+    source, target = [], []
+    previous = None
+    for subtitle in collated:
+        if previous is not None and subtitle.start - previous.end >= gap_length * MICROSECONDS_PER_SECOND:
+            partitions.append(_close(len(partitions), source, target, previous))
+            source, target = [], []
+        subtitle.utterances = set()  # clear utterances generated by Subtitles class
+        (source if subtitle.is_source else target).append(subtitle)
+        previous = subtitle
+
+    if previous is not None:
+        partitions.append(_close(len(partitions), source, target, previous))
     return partitions
 
 
@@ -0,0 +1,59 @@
+class IntervalIndex:
+    """
+    IntervalIndex stores subtitles (or anything with start and end timecodes) sorted by start time
+    and augmented with the maximum end time of each implicit subtree. This allows finding everything
+    that overlaps a time range in O(log n + k) instead of scanning every subtitle.
+    """
+
+    def __init__(self, items):
+        """
+        :param items: subtitles or utterances with integer start and end attributes
+        """
+        self.items = sorted(items, key=lambda item: item.start)
+        self.starts = [item.start for item in self.items]
+        self.ends = [item.end for item in self.items]
+        # max_ends[mid] holds the largest end of the subtree rooted at mid in the implicit tree
+        # where the root of items[lo:hi] is items[(lo + hi) // 2]
+        self.max_ends = [0] * len(self.items)
+        if len(self.items):
+            self._augment(0, len(self.items))
+
+    def _augment(self, lo, hi) -> int:
+        mid = (lo + hi) // 2
+        max_end = self.ends[mid]
+        if lo < mid:
+            max_end = max(max_end, self._augment(lo, mid))
+        if mid + 1 < hi:
+            max_end = max(max_end, self._augment(mid + 1, hi))
+        self.max_ends[mid] = max_end
+        return max_end
+
+    def find(self, start, end) -> list:
+        """
+        Find everything that overlaps the time range, i.e. item.end > start and item.start < end
+        :return: overlapping items sorted by start time
+        """
+        found = []
+        # Bail out early when nothing starts before the end of the range
+        if len(self.items) and self.starts[0] < end:
+            self._collect(0, len(self.items), start, end, found)
+        return found
+
+    def _collect(self, lo, hi, start, end, found):
+        mid = (lo + hi) // 2
+        if self.max_ends[mid] <= start:
+            return
+        if lo < mid:
+            self._collect(lo, mid, start, end, found)
+        if self.starts[mid] >= end:
+            return
+        if self.ends[mid] > start:
+            found.append(self.items[mid])
+        if mid + 1 < hi:
+            self._collect(mid + 1, hi, start, end, found)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
@@ -0,0 +1,135 @@
+import gzip
+import os
+import shutil
+
+import numpy as np
+import regex
+
+EXPORT_FILE = 'export.txt'
+EMPTY_MOVIE = 'Empty Movie'
+# Columns of export.txt used by the importer, counting from 0
+ID_COLUMN = 1
+LANGUAGE_COLUMN = 2
+TITLE_COLUMN = 7
+YEAR_COLUMN = 8
+SEASON_COLUMN = 13
+EPISODE_COLUMN = 14
+# Digits of the subtitle id, from the last one, which make up its directory in the dump
+SHARD_DEPTH = 4
+
+
+def clean_title(title) -> str:
+    """
+    Title as a directory name, like import_from_opensubtitles.sh makes it
+    """
+    title = regex.sub(r'[^a-zA-Z0-9_-]', '', title.replace(' ', '_'))
+    return regex.sub(r'_{2,}', '_', title)
+
+
+def shard_path(files_dir, subtitle_id) -> str:
+    """
+    :return: path of a subtitle in the dump, e.g. files/2/3/4/3/154923432.gz
+    """
+    digits = str(subtitle_id)
+    shards = [digits[-i] if i <= len(digits) else '' for i in range(1, SHARD_DEPTH + 1)]
+    return os.path.join(files_dir, *shards, f'{digits}.gz')
+
+
+def _int(field) -> int:
+    field = field.strip()
+    return int(field) if field.isdigit() else -1
+
+
+class ExportTable:
+    """
+    ExportTable holds the rows of export.txt the importer needs in columns, so it can be read once and filtered by
+    year and language without going back to the file.
+    """
+
+    def __init__(self, ids, languages: [str], titles: [str], years, seasons, episodes):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.languages = np.asarray(languages, dtype=object)
+        self.titles = np.asarray(titles, dtype=object)
+        self.years = np.asarray(years, dtype=np.int64)
+        self.seasons = np.asarray(seasons, dtype=np.int64)
+        self.episodes = np.asarray(episodes, dtype=np.int64)
+
+    @classmethod
+    def from_file(cls, filename) -> "ExportTable":
+        columns = ([], [], [], [], [], [])
+        with open(filename, 'r', encoding='utf-8', errors='replace') as file:
+            for line in file:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) <= YEAR_COLUMN or not fields[ID_COLUMN].strip().isdigit():
+                    # The header, or a line cut short
+                    continue
+                columns[0].append(int(fields[ID_COLUMN]))
+                columns[1].append(fields[LANGUAGE_COLUMN])
+                columns[2].append(fields[TITLE_COLUMN])
+                columns[3].append(_int(fields[YEAR_COLUMN]))
+                columns[4].append(_int(fields[SEASON_COLUMN]) if len(fields) > SEASON_COLUMN else -1)
+                columns[5].append(_int(fields[EPISODE_COLUMN]) if len(fields) > EPISODE_COLUMN else -1)
+        return cls(*columns)
+
+    def select(self, first_year=None, last_year=None, languages=None) -> np.ndarray:
+        """
+        :param languages: language codes to keep, or None for all of them
+        :return: rows within the years and languages, leaving out empty movies and titles without a usable name
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if first_year is not None:
+            keep &= self.years >= first_year
+        if last_year is not None:
+            keep &= self.years <= last_year
+        if languages is not None:
+            keep &= np.isin(self.languages, list(languages))
+        rows = np.flatnonzero(keep)
+        return np.array([row for row in rows.tolist()
+                         if EMPTY_MOVIE not in self.titles[row] and len(clean_title(self.titles[row]))],
+                        dtype=np.int64)
+
+    def is_movie(self, row) -> bool:
+        return self.seasons[row] == 0 and self.episodes[row] == 0
+
+    def title_dir(self, output_dir, row) -> str:
+        return os.path.join(output_dir, str(self.years[row]), clean_title(self.titles[row]))
+
+    def destination(self, output_dir, row) -> str:
+        return os.path.join(self.title_dir(output_dir, row), self.languages[row], f'{self.ids[row]}.srt')
+
+    def info(self, row) -> str:
+        """
+        :return: contents of the info.txt of the row's title
+        """
+        lines = [f'TITLE: {self.titles[row]}', f'YEAR: {self.years[row]}', f'ID: {self.ids[row]}']
+        if self.is_movie(row):
+            lines.append('TYPE: FILM')
+        else:
+            season, episode = [value if value >= 0 else '' for value in (self.seasons[row], self.episodes[row])]
+            lines += ['TYPE: SERIES', f'SEASON: {season}', f'EPISODE: {episode}']
+        return '\n'.join(lines) + '\n'
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def extract(task) -> (str, str):
+    """
+    Decompress one subtitle from the dump, unless it was extracted already
+    :param task: path of the .gz file and the .srt to write
+    :return: the destination, and an error message or None
+    """
+    source, destination = task
+    if os.path.exists(destination):
+        return destination, None
+    if not os.path.exists(source):
+        return destination, f'Missing {source}'
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        # Written under another name first so an interrupted import doesn't leave a partial file behind
+        with gzip.open(source, 'rb') as compressed, open(destination + '.tmp', 'wb') as file:
+            shutil.copyfileobj(compressed, file)
+        os.replace(destination + '.tmp', destination)
+    except (OSError, EOFError) as e:
+        return destination, f'Failed to extract {source}: {e}'
+    return destination, None
@@ -0,0 +1,77 @@
+import hashlib
+
+import numpy as np
+
+from src.embedding_cache import normalize
+
+BLANK_LINE = 'BLANK_LINE'
+
+
+def preprocess_line(sentence) -> str:
+    """
+    Same as vecalign's preprocess_line, which stands in for blank sentences before overlaps are made
+    """
+    return sentence.strip() or BLANK_LINE
+
+
+def span_keys(sentences: [str], num_overlaps) -> np.ndarray:
+    """
+    Hash every run of 1 to num_overlaps consecutive sentences without joining them into new strings. Each key is
+    equal to embedding_cache.text_key of the run of preprocessed sentences joined with spaces, so spans and overlap
+    lines can be mixed.
+    :return: (num_overlaps, len(sentences)) uint64 array, with 0 for runs past the last sentence
+    """
+    pieces = [normalize(preprocess_line(sentence)).encode('utf-8') for sentence in sentences]
+    keys = np.zeros((num_overlaps, len(pieces)), dtype=np.uint64)
+    for start in range(len(pieces)):
+        hasher = hashlib.blake2b(digest_size=8)
+        for length in range(1, min(num_overlaps, len(pieces) - start) + 1):
+            if length > 1:
+                hasher.update(b' ')
+            hasher.update(pieces[start + length - 1])
+            keys[length - 1, start] = int.from_bytes(hasher.digest(), 'little')
+    return keys
+
+
+class OverlapSpans:
+    """
+    OverlapSpans holds the distinct overlaps of a document as (start, length) spans over its sentences rather than
+    as strings. Spans are kept in the order they were added, shortest first within each partition, and only the
+    first span with any given text is kept.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.lengths = []
+        self.keys = []
+        self._seen = set()
+
+    def add(self, sentences: [str], offset, num_overlaps):
+        """
+        :param sentences: sentences of one partition
+        :param offset: position of the first of them within the document
+        """
+        keys = span_keys(sentences, num_overlaps).tolist()
+        for length in range(1, num_overlaps + 1):
+            for start in range(len(sentences) - length + 1):
+                key = keys[length - 1][start]
+                if key in self._seen:
+                    continue
+                self._seen.add(key)
+                self.starts.append(offset + start)
+                self.lengths.append(length)
+                self.keys.append(key)
+
+    def text(self, sentences: [str], i) -> str:
+        start = self.starts[i]
+        return ' '.join(preprocess_line(sentence) for sentence in sentences[start:start + self.lengths[i]])
+
+    def texts(self, sentences: [str], start=0, end=None):
+        """
+        Generate the text of each span, one at a time
+        """
+        for i in range(start, len(self) if end is None else end):
+            yield self.text(sentences, i)
+
+    def __len__(self):
+        return len(self.starts)
@@ -0,0 +1,127 @@
+import numpy as np
+
+from src.helpers import read_srt_blocks
+from src.subtitle import parse_time_code_lines, _parse_time_codes, MICROSECONDS_PER_SECOND
+from src.timecode_band import detect_offset, _covered_time
+from src.timecode_overlap import overlap_pairs
+
+FRAME_RATES = [23.976, 24, 25, 29.97]
+# Scalings between timecodes of releases timed for different frame rates
+DRIFT_RATIOS = sorted({a / b for a in FRAME_RATES for b in FRAME_RATES})
+DEFAULT_TOP_K = 2
+
+
+def read_timecodes(srt_file) -> (np.ndarray, np.ndarray):
+    """
+    Read only the timecodes of a file, skipping the text processing done by Subtitle
+    :return: start and end of each subtitle, in microseconds
+    """
+    lines = [(block.split('\n', 2) + [''])[1] for block in read_srt_blocks(srt_file)]
+    starts, ends = parse_time_code_lines(lines)
+    for i in np.flatnonzero(starts < 0).tolist():
+        time_codes = _parse_time_codes(lines[i])
+        if time_codes is not None:
+            starts[i], ends[i] = time_codes[0], time_codes[1]
+    valid = starts >= 0
+    return starts[valid], ends[valid]
+
+
+def overlap_fraction(source_starts, source_ends, target_starts, target_ends) -> float:
+    """
+    :return: share of the time covered by the source which is also covered by the target
+    """
+    durations = np.maximum(source_ends - source_starts, 0)
+    if durations.sum() == 0:
+        return 0.0
+    rows, _, overlaps = overlap_pairs(source_starts, source_ends, target_starts, target_ends)
+    covered = np.bincount(rows, weights=np.maximum(overlaps, 0), minlength=len(source_starts))
+    return float(np.minimum(covered, durations).sum() / durations.sum())
+
+
+def chance_overlap(target_starts, target_ends, span_start, span_end) -> float:
+    """
+    :return: overlap_fraction expected against unrelated source subtitles spread between span_start and span_end,
+    which is how much of that time the target covers
+    """
+    if span_end <= span_start:
+        return 0.0
+    covered = _covered_time(target_starts, target_ends)(np.array([span_start, span_end]))
+    return float((covered[1] - covered[0]) / (span_end - span_start))
+
+
+def _ratio(a, b) -> float:
+    return min(a, b) / max(a, b) if max(a, b) > 0 else 0.0
+
+
+class PairScore:
+    """
+    PairScore estimates from timecodes alone how well two releases of the same title will align, so only the most
+    promising pairs need to be embedded and aligned. Each signal is between 0 and 1, higher being better.
+    """
+
+    def __init__(self, source_srt, target_srt, count_ratio, duration_ratio, overlap, drift=1.0, offset=0):
+        self.source_srt = source_srt
+        self.target_srt = target_srt
+        self.count_ratio = count_ratio
+        self.duration_ratio = duration_ratio
+        # Overlap beyond what unrelated subtitles would reach
+        self.overlap = overlap
+        # Scaling and shift, in microseconds, which line the target up with the source best
+        self.drift = drift
+        self.offset = offset
+
+    @property
+    def score(self) -> float:
+        return self.count_ratio * self.duration_ratio * self.overlap
+
+    def __repr__(self):
+        return (f'{self.score:.4f}\t{self.source_srt}\t{self.target_srt}\tcount ratio: {self.count_ratio:.3f}, '
+                f'duration ratio: {self.duration_ratio:.3f}, overlap: {self.overlap:.3f}, drift: {self.drift:.4f}, '
+                f'offset: {self.offset / MICROSECONDS_PER_SECOND:.1f}s')
+
+
+def score_pair(source_srt, target_srt, source_timecodes=None, target_timecodes=None) -> PairScore:
+    """
+    :param source_timecodes: starts and ends from read_timecodes, to avoid reading the file again
+    """
+    source_starts, source_ends = source_timecodes or read_timecodes(source_srt)
+    target_starts, target_ends = target_timecodes or read_timecodes(target_srt)
+    count_ratio = _ratio(len(source_starts), len(target_starts))
+    if len(source_starts) == 0 or len(target_starts) == 0:
+        return PairScore(source_srt, target_srt, count_ratio, 0.0, 0.0)
+
+    # Releases timed for different frame rates differ in length by the ratio of the frame rates
+    source_duration = source_ends.max() - source_starts.min()
+    target_duration = target_ends.max() - target_starts.min()
+    observed = target_duration / max(source_duration, 1)
+    nearest = min(DRIFT_RATIOS, key=lambda ratio: abs(observed / ratio - 1))
+    best = None
+    for drift in sorted({1.0, nearest}):
+        starts = (target_starts / drift).astype(np.int64)
+        ends = (target_ends / drift).astype(np.int64)
+        offset = detect_offset(source_starts, source_ends, starts, ends)
+        overlap = overlap_fraction(source_starts + offset, source_ends + offset, starts, ends)
+        if best is None or overlap > best[0]:
+            best = (overlap, drift, offset, starts, ends)
+    overlap, drift, offset, starts, ends = best
+    chance = chance_overlap(starts, ends, source_starts.min() + offset, source_ends.max() + offset)
+    overlap = max(overlap - chance, 0) / (1 - chance) if chance < 1 else overlap
+    duration_ratio = _ratio(source_duration, ends.max() - starts.min())
+    return PairScore(source_srt, target_srt, count_ratio, duration_ratio, overlap, drift, offset)
+
+
+def rank_pairs(source_files, target_files) -> [PairScore]:
+    """
+    Score every pair of source and target files, reading each file once
+    :return: scores of all pairs, best first
+    """
+    source_timecodes = [read_timecodes(file) for file in source_files]
+    target_timecodes = [read_timecodes(file) for file in target_files]
+    scores = [score_pair(source, target, source_spans, target_spans)
+              for source, source_spans in zip(source_files, source_timecodes)
+              for target, target_spans in zip(target_files, target_timecodes)]
+    return sorted(scores, key=lambda pair_score: pair_score.score, reverse=True)
+
+
+def top_pairs(source_files, target_files, k=DEFAULT_TOP_K) -> [(str, str)]:
+    return [(pair_score.source_srt, pair_score.target_srt) for pair_score in rank_pairs(source_files, target_files)[:k]]
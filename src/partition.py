@@ -6,6 +6,7 @@ class Partition:
         """
         Side is either source or target
         """
+        __slots__ = ('is_source', 'subtitles', 'utterances')
 
         def __init__(self, is_source=True):
             self.is_source = is_source
@@ -32,6 +33,8 @@ class Partition:
         def __str__(self):
             return ' '.join([str(u).strip() for u in self.utterances])
 
+    __slots__ = ('index', 'source', 'target', 'start', 'end')
+
     def __init__(self, index):
         self.index = index
         self.source = Partition.Language(True)
@@ -0,0 +1,450 @@
+"""
+Aligns a pair of subtitle files in a single process. This runs the same chain as run_vecalign.sh (srt2overlap.py,
+sent2path.sh, LASER embed.sh, vecalign.py and path2align.py) but keeps sentences, overlaps and embeddings in memory
+and only loads the encoder once, no matter how many pairs are aligned.
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
+
+import numpy as np
+
+from src.aligner import align
+from src.artifacts import ArtifactStore, file_key, combine_keys, config_key
+from src.config import Config
+from src.embedding_cache import EMBEDDING_DIM, CachedEncoder
+from src.embeddings import OverlapIndex, doc_embedding
+from src.helpers import collate_subs, find_partitions_by_gap_size, merge_ellipsized, get_language_code_from_path
+from src.languages import Languages
+from src.overlap_spans import OverlapSpans
+from src.subtitles import Subtitles
+from src.timecode_band import timecode_band
+
+# vecalign defaults, which sent2path.sh relies on
+VECALIGN_NUM_OVERLAPS = 4
+VECALIGN_DEL_PERCENTILE_FRAC = 0.2
+VECALIGN_SEARCH_BUFFER_SIZE = 5
+VECALIGN_MAX_SIZE_FULL_DP = 300
+VECALIGN_COSTS_SAMPLE_SIZE = 20000
+VECALIGN_NUM_SAMPS_FOR_NORM = 100
+
+# Overlaps to join into strings and embed at a time
+EMBED_BATCH_SIZE = 2048
+
+# vecalign needs the external checkout, numpy uses src.aligner
+ALIGNERS = ['vecalign', 'numpy']
+
+
+def layer(lines, num_overlaps, comb=' '):
+    out = []
+    for ii in range(len(lines) - num_overlaps + 1):
+        out.append(comb.join(lines[ii:ii + num_overlaps]))
+    return out
+
+
+def yield_overlaps(lines, num_overlaps):
+    for overlap in range(1, num_overlaps + 1):
+        for out_line in layer(lines, overlap):
+            yield out_line
+
+
+class Document:
+    """
+    Sentences extracted from one subtitle file, the subtitle indices behind each sentence and the overlaps to embed.
+    Holds what srt2overlap.py writes to the .sent, .sent-index and .overlap files.
+    """
+
+    def __init__(self, srt_file, language_code):
+        self.srt_file = srt_file
+        self.language_code = language_code
+        self.sentences = []
+        self.indices = []
+        # Timecodes of each sentence
+        self.starts = []
+        self.ends = []
+        # Offset of the first sentence of each partition
+        self.partition_offsets = []
+        self.spans = OverlapSpans()
+
+    def add_partition(self, utterances, num_overlaps):
+        """
+        Overlaps are only generated within a partition, never across two of them
+        """
+        texts = [utterance.text for utterance in utterances]
+        offset = len(self.sentences)
+        self.partition_offsets.append(offset)
+        self.sentences.extend(texts)
+        self.indices.extend(sorted([sub.index for sub in utterance.subtitles]) for utterance in utterances)
+        self.starts.extend(utterance.start() for utterance in utterances)
+        self.ends.extend(utterance.end() for utterance in utterances)
+        self.spans.add(texts, offset, num_overlaps)
+
+    def partitions(self) -> [(int, int)]:
+        """
+        :return: start and end sentence offset of each partition
+        """
+        ends = self.partition_offsets[1:] + [len(self.sentences)]
+        return list(zip(self.partition_offsets, ends))
+
+    def overlaps(self) -> [str]:
+        """
+        :return: text of every overlap, in the order of self.spans
+        """
+        return list(self.spans.texts(self.sentences))
+
+    def associated_file(self, extension) -> str:
+        # Gzipped subtitles get plain text outputs next to them
+        return self.srt_file.removesuffix('.gz').replace('.srt', extension)
+
+    def write(self, index=True, overlaps=True):
+        """
+        Write the .sent file, and optionally the .sent-index and .overlap files, next to the subtitle file
+        """
+        with open(self.associated_file('.sent'), 'w', encoding='utf-8') as file:
+            for sentence in self.sentences:
+                file.write(sentence + '\n')
+        if index:
+            with open(self.associated_file('.sent-index'), 'w', encoding='utf-8') as file:
+                for indices in self.indices:
+                    file.write(str(indices) + '\n')
+        if overlaps:
+            with open(self.associated_file('.overlap'), 'w', encoding='utf-8') as file:
+                for line in self.spans.texts(self.sentences):
+                    file.write(line + '\n')
+
+    def __len__(self):
+        return len(self.sentences)
+
+
+def extract_documents(source_srt, target_srt, source_language=None, target_language=None,
+                      num_overlaps=Config.NumOverlaps, gap_length=Config.GapThreshold,
+                      partition=Config.ShouldPartitionByGaps) -> (Document, Document):
+    """
+    Extract sentences and overlaps from a pair of subtitle files
+    :param source_language: language name, taken from the parent directory of the file when not given
+    :param partition: when False, the whole file is treated as a single partition like srt2sent.py does
+    """
+    source_subs = read_subtitles(source_srt, source_language, is_source=True)
+    target_subs = read_subtitles(target_srt, target_language, is_source=False)
+    return pair_documents(source_srt, source_subs, target_srt, target_subs, num_overlaps, gap_length, partition)
+
+
+def read_subtitles(srt_file, language=None, is_source=True) -> Subtitles:
+    """
+    :param language: language name, taken from the parent directory of the file when not given
+    """
+    code = get_language_code_from_path(srt_file)
+    return Subtitles.from_file(srt_file, language or Languages.get_language_name(code), is_source=is_source)
+
+
+def pair_documents(source_srt, source_subs: Subtitles, target_srt, target_subs: Subtitles,
+                   num_overlaps=Config.NumOverlaps, gap_length=Config.GapThreshold,
+                   partition=Config.ShouldPartitionByGaps) -> (Document, Document):
+    """
+    Extract sentences and overlaps from subtitles which were already read. Partitioning rebuilds the utterances of
+    every subtitle, so the same source subtitles can be paired with one target after another.
+    """
+    source = Document(source_srt, get_language_code_from_path(source_srt))
+    target = Document(target_srt, get_language_code_from_path(target_srt))
+    if partition:
+        collated = collate_subs(source_subs.subtitles, target_subs.subtitles)
+        partitions = find_partitions_by_gap_size(collated, gap_length)
+        if Config.MergeEllipsized > 0:
+            partitions = merge_ellipsized(partitions, Config.MergeEllipsized)
+        for part in partitions:
+            source.add_partition(part.source.utterances, num_overlaps)
+            target.add_partition(part.target.utterances, num_overlaps)
+    else:
+        source.add_partition(source_subs.utterances, num_overlaps)
+        target.add_partition(target_subs.utterances, num_overlaps)
+    return source, target
+
+
+class Encoder:
+    """
+    LASER sentence encoder, loaded once and kept in memory
+    """
+
+    def __init__(self, laser='laser2'):
+        try:
+            from laser_encoders import LaserEncoderPipeline
+        except ModuleNotFoundError:
+            raise (Exception("The laser_encoders package is needed to embed sentences in-process. "
+                             "Install it with: pip install laser_encoders"))
+        self.id = laser
+        self.model = LaserEncoderPipeline(laser=laser)
+
+    def encode(self, sentences: [str], language=None) -> np.ndarray:
+        """
+        :param language: unused, LASER is language agnostic
+        :return: float32 array with one row per sentence, the same as an .emb file written by LASER's embed.sh
+        """
+        if len(sentences) == 0:
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        return np.asarray(self.model.encode_sentences(sentences), dtype=np.float32)
+
+
+_encoder = None
+
+
+def get_encoder() -> Encoder:
+    global _encoder
+    if _encoder is None:
+        _encoder = Encoder()
+    return _encoder
+
+
+def embed_overlaps(encoder, document: Document, batch_size=EMBED_BATCH_SIZE, known: dict = None) -> np.ndarray:
+    """
+    Embed the overlaps of a document, only joining one batch of spans into strings at a time
+    :param known: embeddings by span key from documents embedded before. Only spans missing from it are embedded,
+    and they are added to it.
+    :return: float32 array with one row per span of document.spans
+    """
+    if len(document.spans) == 0:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    if known is not None:
+        keys = document.spans.keys
+        missing = [i for i, key in enumerate(keys) if key not in known]
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            vectors = encoder.encode([document.spans.text(document.sentences, i) for i in batch],
+                                     document.language_code)
+            known.update(zip((keys[i] for i in batch), vectors))
+        return np.array([known[key] for key in keys], dtype=np.float32)
+    embeddings = None
+    for start in range(0, len(document.spans), batch_size):
+        end = min(start + batch_size, len(document.spans))
+        vectors = encoder.encode(list(document.spans.texts(document.sentences, start, end)), document.language_code)
+        if embeddings is None:
+            embeddings = np.empty((len(document.spans), vectors.shape[1]), dtype=np.float32)
+        embeddings[start:end] = vectors
+    return embeddings
+
+
+def _import_vecalign():
+    """
+    vecalign is not an installable package, so import its dp_utils module from the checkout in this repository
+    """
+    repo = os.environ.get('SUBTITLE_REPO', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    path = os.path.join(repo, 'vecalign')
+    if path not in sys.path:
+        sys.path.append(path)
+    try:
+        import dp_utils
+    except ModuleNotFoundError as e:
+        raise (Exception(f"Could not import vecalign from {path}: {e}"))
+    return dp_utils
+
+
+def _vecalign(vecs0, vecs1, alignment_max_size) -> [([int], [int], float)]:
+    dp_utils = _import_vecalign()
+    stack = dp_utils.vecalign(vecs0=vecs0,
+                              vecs1=vecs1,
+                              final_alignment_types=dp_utils.make_alignment_types(alignment_max_size),
+                              del_percentile_frac=VECALIGN_DEL_PERCENTILE_FRAC,
+                              width_over2=ceil(alignment_max_size / 2.0) + VECALIGN_SEARCH_BUFFER_SIZE,
+                              max_size_full_dp=VECALIGN_MAX_SIZE_FULL_DP,
+                              costs_sample_size=VECALIGN_COSTS_SAMPLE_SIZE,
+                              num_samps_for_norm=VECALIGN_NUM_SAMPS_FOR_NORM)
+    return [(list(x), list(y), float(score))
+            for (x, y), score in zip(stack[0]['final_alignments'], stack[0]['alignment_scores'])]
+
+
+def _align_section(task) -> [([int], [int], float)]:
+    vecs0, vecs1, alignment_max_size, aligner, band = task
+    # Nothing to align against, so everything on the other side is deleted
+    if vecs0.shape[1] == 0 or vecs1.shape[1] == 0:
+        return ([([i], [], 0.0) for i in range(vecs0.shape[1])] +
+                [([], [j], 0.0) for j in range(vecs1.shape[1])])
+    if aligner == 'numpy':
+        return align(vecs0, vecs1, alignment_max_size, band=band)
+    return _vecalign(vecs0, vecs1, alignment_max_size)
+
+
+def align_documents(source: Document, target: Document, source_embeddings, target_embeddings,
+                    alignment_max_size=Config.AlignmentMaxSize, by_partition=False, workers=1,
+                    aligner='vecalign', tolerance=None) -> [([int], [int], float)]:
+    """
+    Run the alignment DP over embeddings which are already in memory
+    :param source_embeddings: one row per span of source.spans
+    :param by_partition: align each partition on its own instead of the whole film as one sequence
+    :param workers: number of processes to align partitions with
+    :param aligner: one of ALIGNERS
+    :param tolerance: only consider target sentences within this many seconds of each source sentence
+    :return: the alignment path as (source sentence ids, target sentence ids, score)
+    """
+    if tolerance is not None and aligner != 'numpy':
+        raise (Exception("Aligning within timecode tolerance needs the numpy aligner"))
+    source_index = OverlapIndex.from_keys(source.spans.keys)
+    target_index = OverlapIndex.from_keys(target.spans.keys)
+    if by_partition:
+        sections = list(zip(source.partitions(), target.partitions()))
+    else:
+        sections = [((0, len(source)), (0, len(target)))]
+
+    def make_task(source_range, target_range):
+        source_slice, target_slice = slice(*source_range), slice(*target_range)
+        band = None
+        if tolerance is not None:
+            band = timecode_band(source.starts[source_slice], source.ends[source_slice],
+                                 target.starts[target_slice], target.ends[target_slice], tolerance)
+        return (doc_embedding(source_index, source_embeddings, source.sentences[source_slice], VECALIGN_NUM_OVERLAPS),
+                doc_embedding(target_index, target_embeddings, target.sentences[target_slice], VECALIGN_NUM_OVERLAPS),
+                alignment_max_size, aligner, band)
+
+    tasks = (make_task(source_range, target_range) for source_range, target_range in sections)
+    if workers > 1 and len(sections) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_align_section, tasks))
+    else:
+        results = [_align_section(task) for task in tasks]
+
+    # Stitch the partitions back together using their offsets within the whole film
+    path = []
+    for ((source_offset, _), (target_offset, _)), section_path in zip(sections, results):
+        for source_ids, target_ids, score in section_path:
+            path.append(([i + source_offset for i in source_ids], [j + target_offset for j in target_ids], score))
+    return path
+
+
+def path_lines(path) -> [str]:
+    """
+    :return: lines of a .path file, as printed by vecalign
+    """
+    return ['%s:%s:%.6f' % (source_ids, target_ids, score) for source_ids, target_ids, score in path]
+
+
+def aligned_sentences(path, source: Document, target: Document, join_token=' ') -> [(str, str)]:
+    """
+    Same as path2align.py: join the sentences of each alignment and skip the one-sided ones
+    """
+    pairs = []
+    for source_ids, target_ids, _ in path:
+        source_sentence = join_token.join(source.sentences[i].strip() for i in source_ids)
+        target_sentence = join_token.join(target.sentences[i].strip() for i in target_ids)
+        if len(source_sentence) and len(target_sentence):
+            pairs.append((source_sentence, target_sentence))
+    return pairs
+
+
+def output_files(source_srt, target_srt) -> (str, str):
+    """
+    :return: the .path and .txt files run_vecalign.sh would write for this pair
+    """
+    base_dirname = os.path.dirname(os.path.dirname(source_srt))
+    basename = os.path.basename(source_srt).removesuffix('.gz').removesuffix('.srt')
+    # Keep the suffix of partitioned subtitle files, e.g. 1234-001.srt
+    parts = basename.split('-')
+    suffix = f'-{parts[1]}' if len(parts) > 1 and len(parts[1]) == 3 and parts[1].isdigit() else ''
+    prefix = (f'{get_language_code_from_path(source_srt)}-{get_language_code_from_path(target_srt)}'
+              f'-vecalign{suffix}')
+    return os.path.join(base_dirname, f'{prefix}.path'), os.path.join(base_dirname, f'{prefix}.txt')
+
+
+def align_pair(source_srt, target_srt, encoder: Encoder = None, write_files=False, by_partition=False, workers=1,
+               aligner='vecalign', tolerance=None, store: ArtifactStore = None,
+               **kwargs) -> ([([int], [int], float)], Document, Document):
+    """
+    Align two subtitle files with sentence embeddings
+    :param encoder: defaults to a LASER encoder shared by every call in this process. Wrap it in a CachedEncoder
+    to reuse embeddings across titles.
+    :param write_files: write the .sent, .sent-index, .path and .txt files like run_vecalign.sh does
+    :param by_partition: run the DP for each partition separately
+    :param workers: number of processes to align partitions with
+    :param aligner: one of ALIGNERS
+    :param tolerance: seconds of timecode tolerance to restrict the numpy aligner's search with
+    :param store: reuse the documents, embeddings and path from earlier runs over the same content. After timecodes
+    change, sentences are extracted and aligned again but only text that hasn't been seen before is embedded. When
+    the encoder is a CachedEncoder already, its cache is used instead of the store's.
+    :param kwargs: passed on to extract_documents
+    :return: the alignment path and the source and target documents it refers to
+    """
+    documents = path = None
+    if store is not None:
+        documents_key = combine_keys(file_key(source_srt), file_key(target_srt), sorted(kwargs.items()), config_key())
+        path_key = combine_keys(documents_key, store.embeddings.encoder_id, by_partition, aligner, tolerance)
+        documents = store.load('documents', documents_key)
+        path = store.load('path', path_key)
+    if documents is None:
+        documents = extract_documents(source_srt, target_srt, **kwargs)
+        if store is not None:
+            store.save('documents', documents_key, documents)
+    source, target = documents
+    # The same subtitles may have been stored from another location
+    source.srt_file, target.srt_file = source_srt, target_srt
+
+    if path is None:
+        encoder = encoder or get_encoder()
+        # An encoder which is cached already would otherwise look up and write every embedding in two caches
+        if store is not None and not isinstance(encoder, CachedEncoder):
+            encoder = CachedEncoder(encoder, store.embeddings)
+        source_embeddings = embed_overlaps(encoder, source)
+        target_embeddings = embed_overlaps(encoder, target)
+        path = align_documents(source, target, source_embeddings, target_embeddings, by_partition=by_partition,
+                               workers=workers, aligner=aligner, tolerance=tolerance)
+        if store is not None:
+            store.save('path', path_key, path)
+
+    if write_files:
+        write_alignment(path, source, target)
+    return path, source, target
+
+
+def _align_target(job) -> [([int], [int], float)]:
+    source, target, source_embeddings, target_embeddings, kwargs = job
+    return align_documents(source, target, source_embeddings, target_embeddings, **kwargs)
+
+
+def align_targets(source_srt, target_srts: [str], encoder: Encoder = None, write_files=False, by_partition=False,
+                  workers=1, aligner='vecalign', tolerance=None, source_language=None, num_overlaps=Config.NumOverlaps,
+                  gap_length=Config.GapThreshold,
+                  partition=Config.ShouldPartitionByGaps) -> [([([int], [int], float)], Document, Document)]:
+    """
+    Align one source file with several targets, e.g. the eng subtitles of a title with its spa, ger and fre ones.
+    The source is read and sterilized once, and each of its overlaps is embedded once across all targets. The DP
+    for the targets runs in parallel.
+    With partitioning, source sentences depend on the target they were partitioned with, so the source .sent files
+    written match the last target. The .path and .txt files are correct for every target.
+    :param workers: number of processes to run the DP for the targets in
+    :return: path, source and target document for each target, in order
+    """
+    encoder = encoder or get_encoder()
+    source_subs = read_subtitles(source_srt, source_language, is_source=True)
+    known = {}
+    jobs = []
+    for target_srt in target_srts:
+        target_subs = read_subtitles(target_srt, is_source=False)
+        source, target = pair_documents(source_srt, source_subs, target_srt, target_subs, num_overlaps, gap_length,
+                                        partition)
+        jobs.append((source, target, embed_overlaps(encoder, source, known=known), embed_overlaps(encoder, target),
+                     dict(by_partition=by_partition, aligner=aligner, tolerance=tolerance)))
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            paths = list(executor.map(_align_target, jobs))
+    else:
+        paths = [_align_target(job) for job in jobs]
+
+    results = []
+    for path, (source, target, _, _, _) in zip(paths, jobs):
+        if write_files:
+            write_alignment(path, source, target)
+        results.append((path, source, target))
+    return results
+
+
+def write_alignment(path, source: Document, target: Document):
+    """
+    Write the .sent, .sent-index, .path and .txt files like run_vecalign.sh does
+    """
+    source.write(overlaps=False)
+    target.write(overlaps=False)
+    path_file, alignments_file = output_files(source.srt_file, target.srt_file)
+    with open(path_file, 'w', encoding='utf-8') as file:
+        for line in path_lines(path):
+            file.write(line + '\n')
+    with open(alignments_file, 'w', encoding='utf-8') as file:
+        for source_sentence, target_sentence in aligned_sentences(path, source, target):
+            file.write(f'{source_sentence}\n{target_sentence}' + '\n\n')
@@ -3,6 +3,7 @@ from datetime import datetime
 from difflib import SequenceMatcher
 from typing import Optional
 
+import numpy as np
 import regex
 from nltk import sent_tokenize
 import sys
@@ -13,23 +14,43 @@ from src.languages import Languages
 TIMECODE_SEPARATOR = ' --> '
 TIMECODE_LINE_REGEX = r'(\d{2}:\d{2}:\d{2},\d{3}).+(\d{2}:\d{2}:\d{2},\d{3})'
 SRT_TIME_FORMAT = '%H:%M:%S,%f'
+TIMECODE_LAYOUT = '00:00:00,000'
+TIMECODE_LENGTH = len(TIMECODE_LAYOUT)
+TIMECODE_LINE_LENGTH = TIMECODE_LENGTH * 2 + len(TIMECODE_SEPARATOR)
+MICROSECONDS_PER_MILLISECOND = 1000
+MICROSECONDS_PER_SECOND = 1000000
+
+
+def _timestring_to_microseconds(timestring) -> int:
+    """
+    Parse 'HH:MM:SS,mmm' by its fixed layout. Anything else falls back to strptime, which raises on bad input.
+    """
+    if (len(timestring) == TIMECODE_LENGTH and timestring[2] == ':' and timestring[5] == ':'
+            and timestring[8] == ','):
+        hours, minutes, seconds, milliseconds = timestring[0:2], timestring[3:5], timestring[6:8], timestring[9:12]
+        if (hours + minutes + seconds + milliseconds).isdigit():
+            hours, minutes, seconds = int(hours), int(minutes), int(seconds)
+            # strptime rejects these, so let it raise as it always has
+            if hours < 24 and minutes < 60 and seconds < 62:
+                return (int(milliseconds) * MICROSECONDS_PER_MILLISECOND +
+                        (seconds + minutes * 60 + hours * 3600) * MICROSECONDS_PER_SECOND)
+    pt = datetime.strptime(timestring, SRT_TIME_FORMAT)
+    return _datetime_to_microseconds(pt)
+
+
+def _datetime_to_microseconds(pt: datetime) -> int:
+    return pt.microsecond + (pt.second + pt.minute * 60 + pt.hour * 3600) * MICROSECONDS_PER_SECOND
 
 
 def parse_timestring(timestring, offset='00:00:00,000', offset_is_negative=False):
+    microseconds = _timestring_to_microseconds(timestring)
     if isinstance(offset, str):
-        offset = datetime.strptime(offset, SRT_TIME_FORMAT)
-    pt = datetime.strptime(timestring, SRT_TIME_FORMAT)
+        offset = _timestring_to_microseconds(offset)
+    elif isinstance(offset, datetime):
+        offset = _datetime_to_microseconds(offset)
     if offset_is_negative:
-        microsecond = pt.microsecond - offset.microsecond
-        second = pt.second - offset.second
-        minute = pt.minute - offset.minute
-        hour = pt.hour - offset.hour
-    else:
-        microsecond = pt.microsecond + offset.microsecond
-        second = pt.second + offset.second
-        minute = pt.minute + offset.minute
-        hour = pt.hour + offset.hour
-    return microsecond + (second + minute * 60 + hour * 3600) * 1000000
+        return microseconds - offset
+    return microseconds + offset
 
 
 def _parse_time_codes(timestring) -> (int, int, str):
@@ -37,8 +58,17 @@ def _parse_time_codes(timestring) -> (int, int, str):
     Turn timestrings like '01:23:45,678' into an integer offset milliseconds since movie start
     :return: an integer duration since video start
     """
-
-    match = regex.match(TIMECODE_LINE_REGEX, timestring.strip())
+    line = timestring.strip()
+    # Well formed lines skip the regex entirely
+    if len(line) == TIMECODE_LINE_LENGTH and line[TIMECODE_LENGTH:-TIMECODE_LENGTH] == TIMECODE_SEPARATOR:
+        try:
+            start = _timestring_to_microseconds(line[:TIMECODE_LENGTH])
+            end = _timestring_to_microseconds(line[-TIMECODE_LENGTH:])
+            return start, end, line
+        except ValueError:
+            pass
+
+    match = regex.match(TIMECODE_LINE_REGEX, line)
     if match is not None and len(match.groups()) > 1:
         start = parse_timestring(match.group(1))
         end = parse_timestring(match.group(2))
@@ -50,6 +80,65 @@ def _parse_time_codes(timestring) -> (int, int, str):
         return None
 
 
+# Character positions of each timecode field within 'HH:MM:SS,mmm --> HH:MM:SS,mmm'
+_HOURS, _MINUTES, _SECONDS, _MILLISECONDS = [0, 1], [3, 4], [6, 7], [9, 10, 11]
+_DIGIT_COLUMNS = _HOURS + _MINUTES + _SECONDS + _MILLISECONDS
+_SEPARATOR_COLUMNS = [2, 5, 8]
+
+
+def parse_time_code_lines(lines: [str]) -> (np.ndarray, np.ndarray):
+    """
+    Parse the timecode lines of a whole file at once.
+    Lines in the exact 'HH:MM:SS,mmm --> HH:MM:SS,mmm' layout are parsed together as a character matrix.
+    :param lines: timecode lines, one per subtitle
+    :return: int64 arrays of start and end microseconds, -1 where a line needs _parse_time_codes instead
+    """
+    stripped = [line.strip() for line in lines]
+    starts = np.full(len(stripped), -1, dtype=np.int64)
+    ends = np.full(len(stripped), -1, dtype=np.int64)
+    fixed = np.array([len(line) == TIMECODE_LINE_LENGTH and line.isascii() for line in stripped], dtype=bool)
+    if not fixed.any():
+        return starts, ends
+
+    buffer = ''.join(line for line, is_fixed in zip(stripped, fixed) if is_fixed).encode('ascii')
+    chars = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, TIMECODE_LINE_LENGTH)
+    digits = chars.astype(np.int64) - ord('0')
+
+    def _field(columns):
+        value = np.zeros(len(chars), dtype=np.int64)
+        for column in columns:
+            value = value * 10 + digits[:, column]
+        return value
+
+    def _microseconds(offset):
+        hours = _field([c + offset for c in _HOURS])
+        minutes = _field([c + offset for c in _MINUTES])
+        seconds = _field([c + offset for c in _SECONDS])
+        milliseconds = _field([c + offset for c in _MILLISECONDS])
+        valid = (hours < 24) & (minutes < 60) & (seconds < 62)
+        value = milliseconds * MICROSECONDS_PER_MILLISECOND + \
+            (seconds + minutes * 60 + hours * 3600) * MICROSECONDS_PER_SECOND
+        return value, valid
+
+    end_offset = TIMECODE_LENGTH + len(TIMECODE_SEPARATOR)
+    digit_columns = _DIGIT_COLUMNS + [c + end_offset for c in _DIGIT_COLUMNS]
+    valid = np.all((digits[:, digit_columns] >= 0) & (digits[:, digit_columns] <= 9), axis=1)
+    for column in _SEPARATOR_COLUMNS:
+        valid &= chars[:, column] == ord(TIMECODE_LAYOUT[column])
+        valid &= chars[:, column + end_offset] == ord(TIMECODE_LAYOUT[column])
+    separator = np.frombuffer(TIMECODE_SEPARATOR.encode('ascii'), dtype=np.uint8)
+    valid &= np.all(chars[:, TIMECODE_LENGTH:end_offset] == separator, axis=1)
+
+    start, valid_start = _microseconds(0)
+    end, valid_end = _microseconds(end_offset)
+    valid &= valid_start & valid_end
+
+    rows = np.flatnonzero(fixed)[valid]
+    starts[rows] = start[valid]
+    ends[rows] = end[valid]
+    return starts, ends
+
+
 def microseconds_to_string(microseconds):
     milliseconds = int((microseconds / 1e3) % 1e3)
     seconds = int((microseconds / 1e6) % 60)
@@ -101,79 +190,106 @@ MULTIPLE_ADJACENT_SPACES_REGEX = r' {2,}'
 OTHER_CHARS_TO_STRIP = r'[…*]'
 
 
-def sterilize(sub_lines: [str]) -> Optional[str]:
+class Sterilizer:
     """
-    :param sub_lines: lines of text to sterilize
-    :returns: sterilized text
+    Sterilizer holds the compiled patterns for stripping non-dialogue from subtitles and applies them in order.
+    Each pass has an optional trigger, a substring its pattern cannot match without, which lets us skip the pass
+    for the majority of subtitles that are plain dialogue.
     """
-    text = '||'.join(sub_lines)
-    if len(text) == 0:
-        return ''
-    # Completely invalidate subtitles with the musical notes, leading # or URLs
-    if regex.search(MUSICAL_NOTE, text) is not None:
-        return ''
-    if regex.search(LEADING_POUND_SIGN, text) is not None:
-        return ''
-    if regex.search(URL_REGEX, text, regex.MULTILINE) is not None:
-        return ''
-
-    # Remove content surrounded by curly brackets
-    text = regex.sub(CURLY_BRACKET_REGEX, '', text)
-
-    # Remove content surrounded by square brackets
-    text = regex.sub(SQUARE_BRACKET_REGEX, '', text)
 
-    # Multiple words in all caps are no good
-    text = regex.sub(CAPITALS_REGEX, '', text)
-
-    # First strip italic and bold tags
-    text = regex.sub(ITALICS_OR_BOLD_REGEX, '', text)
-
-    # Then remove all other HTML with inner content
-    text = regex.sub(HTML_REGEX, '', text)
+    def __init__(self):
+        # Completely invalidate subtitles with the musical notes, leading # or URLs
+        self.rejections = [
+            (None, regex.compile(MUSICAL_NOTE)),
+            ('#', regex.compile(LEADING_POUND_SIGN)),
+            ('.', regex.compile(URL_REGEX, regex.MULTILINE)),
+        ]
+        self.passes = [
+            # Remove content surrounded by curly brackets
+            ('{', regex.compile(CURLY_BRACKET_REGEX), ''),
+            # Remove content surrounded by square brackets
+            ('[', regex.compile(SQUARE_BRACKET_REGEX), ''),
+            # Multiple words in all caps are no good
+            (None, regex.compile(CAPITALS_REGEX), ''),
+            # First strip italic and bold tags
+            ('<', regex.compile(ITALICS_OR_BOLD_REGEX), ''),
+            # Then remove all other HTML with inner content
+            ('<', regex.compile(HTML_REGEX), ''),
+            # Strip character markers and captions
+            (': ', regex.compile(CHARACTER_MARKER_REGEX), ''),
+            (None, regex.compile(CAPITALS_REGEX), ''),
+            # Strip quoted content. There's no telling whether it's actually a character or an off-screen
+            # Not sure if we should be stripping quotes after all. They're used for when characters are quoting things.
+            # ('"', regex.compile(QUOTES_REGEX), ''),
+            # Remove content surrounded by parenthesis
+            ('(', regex.compile(PARENTHESES_REGEX), ''),
+            # Split on a change of speaker mid line
+            ('-', regex.compile(CHANGE_OF_SPEAKER_REGEX), r"\1\n\2 \3"),
+            # Replace multiple whitespace characters with one
+            (None, regex.compile(MULTIPLE_SPACES), ' '),
+        ]
+        self.multiple_adjacent_spaces = regex.compile(MULTIPLE_ADJACENT_SPACES_REGEX)
+        self.other_chars_to_strip = regex.compile(OTHER_CHARS_TO_STRIP)
+
+    def sterilize(self, sub_lines: [str]) -> Optional[str]:
+        """
+        :param sub_lines: lines of text to sterilize
+        :returns: sterilized text
+        """
+        # Lines are joined with || so line breaks survive the whitespace collapsing pass
+        text = '||'.join(sub_lines)
+        if len(text) == 0:
+            return ''
+        for trigger, pattern in self.rejections:
+            if (trigger is None or trigger in text) and pattern.search(text) is not None:
+                return ''
 
-    # Strip character markers and captions
-    text = regex.sub(CHARACTER_MARKER_REGEX, '', text)
-    text = regex.sub(CAPITALS_REGEX, '', text)
+        for trigger, pattern, replacement in self.passes:
+            if trigger is None or trigger in text:
+                text = pattern.sub(replacement, text)
 
-    # Strip quoted content. There's no telling whether it's actually a character or an off-screen
-    # Not sure if we should be stripping quotes after all. They're used for when characters are quoting things.
-    # text = regex.sub(QUOTES_REGEX, '', text)
+        text = text.strip()
 
-    # Remove content surrounded by parenthesis
-    text = regex.sub(PARENTHESES_REGEX, "", text)
+        return text.replace('||', '\n')
 
-    # Remove leading hyphens
-    # text = regex.sub(LEADING_HYPHENS_REGEX, '', text)
-    text = regex.sub(CHANGE_OF_SPEAKER_REGEX, r"\1\n\2 \3", text)
+    def strip_extras(self, text: str) -> str:
+        """
+        More data stripping once sentences have been split and joined again
+        """
+        text = self.multiple_adjacent_spaces.sub(' ', text)
+        return self.other_chars_to_strip.sub('', text)
 
-    # Remove ellipses
-    # text = regex.sub(ELLIPSES_REGEX, '', text)
 
-    # Replace multiple whitespace characters with one
-    text = regex.sub(MULTIPLE_SPACES, ' ', text)
+STERILIZER = Sterilizer()
 
-    text = text.strip()
 
-    return text.replace('||', '\n')
+def sterilize(sub_lines: [str]) -> Optional[str]:
+    """
+    :param sub_lines: lines of text to sterilize
+    :returns: sterilized text
+    """
+    return STERILIZER.sterilize(sub_lines)
 
 
 class Subtitle:
     """
     Subtitle represents a single visual text element in a movie in just one language
     """
+    __slots__ = ('utterances', 'previous', 'subsequent', 'language', 'is_source', 'lines', 'index', 'start', 'end',
+                 'timestring', 'texts', 'text')
 
     def __init__(self, lines, language, is_source=True, should_sterilize=Config.Sterilize,
-                 find_sentence_boundaries=True):
+                 find_sentence_boundaries=True, time_codes=None):
         """
         :param lines: the raw lines of subtitles. The first line is index, second is timestamps and the rest are the
         content
         :param is_source: is the source or target of the subtitles for alignment
         :param should_sterilize: to sterilize subtitle contents
+        :param time_codes: start, end and timestring if already parsed, see parse_time_code_lines
         """
 
         def _sterilize_and_split(sub_text: [str]):
-            text = sterilize(sub_text)
+            text = STERILIZER.sterilize(sub_text)
             return _split_multiple_speakers(text) if text is not None else None
 
         def _split_multiple_speakers(sub_text):
@@ -206,7 +322,9 @@ class Subtitle:
             print(len(parts[0]))
             print(parts[0].isdigit())
             raise Exception(f'Invalid subtitle: {self.lines}')
-        self.start, self.end, self.timestring = _parse_time_codes(parts[1])
+        if time_codes is None:
+            time_codes = _parse_time_codes(parts[1])
+        self.start, self.end, self.timestring = time_codes
         if should_sterilize:
 
             if find_sentence_boundaries:
@@ -215,10 +333,9 @@ class Subtitle:
                     self.texts = ['']
                 else:
                     # more data stripping
-                    self.text = regex.sub(MULTIPLE_ADJACENT_SPACES_REGEX, ' ', ' '.join(self.texts))
-                    self.text = regex.sub(OTHER_CHARS_TO_STRIP, '', self.text)
+                    self.text = STERILIZER.strip_extras(' '.join(self.texts))
             else:
-                self.text = sterilize(parts[2:])
+                self.text = STERILIZER.sterilize(parts[2:])
         else:
             if find_sentence_boundaries:
                 self.texts = _split_multiple_speakers('\n'.join(parts[2:]))
@@ -256,6 +373,8 @@ class Subtitle:
         """
         self.start = self.start + offset
         self.end = self.end + offset
+        for utterance in self.utterances:
+            utterance.invalidate_span()
         self.timestring = f'{microseconds_to_string(self.start)}{TIMECODE_SEPARATOR}{microseconds_to_string(self.end)}'
         lines = self.lines.split('\n')
         lines[1] = self.timestring
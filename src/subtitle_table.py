@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.config import Config
+from src.helpers import read_srt_blocks
+from src.subtitle import Subtitle
+
+
+class SubtitleTable:
+    """
+    SubtitleTable is a column-oriented store of subtitles in a single language. Indices and timecodes are held in
+    int64 arrays and texts in one string buffer with offsets, which costs a fraction of the memory of Subtitle objects
+    when many titles are loaded at once.
+    """
+    __slots__ = ('indices', 'starts', 'ends', 'text_offsets', 'text_buffer', 'is_source')
+
+    def __init__(self, indices, starts, ends, texts: [str], is_source=True):
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in texts], out=self.text_offsets[1:])
+        self.text_buffer = ''.join(texts)
+        self.is_source = is_source
+
+    @classmethod
+    def from_subtitles(cls, subtitles, is_source=True) -> "SubtitleTable":
+        """
+        :param subtitles: any iterable of subtitles, which is only walked once
+        """
+        indices, starts, ends, texts = [], [], [], []
+        for subtitle in subtitles:
+            indices.append(subtitle.index)
+            starts.append(subtitle.start)
+            ends.append(subtitle.end)
+            texts.append(getattr(subtitle, 'text', None) or '')
+        return cls(indices, starts, ends, texts, is_source)
+
+    @classmethod
+    def from_file(cls, filename, language, is_source=True, sterilize=Config.Sterilize) -> "SubtitleTable":
+        """
+        Build the table straight from an .srt or .srt.gz file, only keeping one Subtitle object alive at a time
+        """
+        subtitles = (Subtitle(block, language, is_source, should_sterilize=sterilize,
+                              find_sentence_boundaries=Config.FindSentenceBoundaries)
+                     for block in read_srt_blocks(filename))
+        return cls.from_subtitles(subtitles, is_source)
+
+    def text(self, row) -> str:
+        return self.text_buffer[self.text_offsets[row]:self.text_offsets[row + 1]]
+
+    def texts(self) -> [str]:
+        offsets = self.text_offsets.tolist()
+        return [self.text_buffer[offsets[i]:offsets[i + 1]] for i in range(len(self))]
+
+    def durations(self) -> np.ndarray:
+        return self.ends - self.starts
+
+    def find_in_range(self, start, end) -> np.ndarray:
+        """
+        Find all subtitles overlapping a time range, like helpers.find_in_range
+        :return: row numbers of the overlapping subtitles
+        """
+        return np.flatnonzero((self.ends > start) & (self.starts < end))
+
+    def __len__(self):
+        return len(self.starts)
@@ -1,12 +1,17 @@
+from itertools import islice
+
 import regex
 import sys
 
 from src.config import Config
-from src.helpers import is_not_empty, collate_subs, find_partitions, find_utterances
-from src.subtitle import Subtitle
+from src.helpers import is_not_empty, collate_subs, find_partitions, find_utterances, read_srt_blocks
+from src.subtitle import Subtitle, parse_time_code_lines
+from src.subtitle_table import SubtitleTable
+from src.timecode_overlap import align_by_overlap
 from src.utterance_pair import UtterancePair
 from src.utterance_options import UtteranceOptions
 from src.utterance import Utterance
+from src.utterance_index import UtteranceIndex
 
 
 class Subtitles:
@@ -16,35 +21,77 @@ class Subtitles:
     on timecodes.
     """
 
+    # Number of subtitles whose timecodes are parsed together when reading blocks lazily
+    BATCH_SIZE = 1000
+
     def __init__(self, text, language, is_source=True, sterilize=Config.Sterilize):
+        """
+        :param text: the contents of an SRT file, or an iterable of subtitle blocks such as read_srt_blocks yields
+        """
         self.is_source = is_source
-        # First strip bad carriage returns:
-        text = regex.sub(r'\r', '', text).strip()
+        if isinstance(text, str):
+            # First strip bad carriage returns:
+            text = regex.sub(r'\r', '', text).strip()
+            # Split on 2 or more lines in a row
+            text = regex.split(r'\n{2,}', text)
+        sub_contents = iter(text)
 
         self.index = 0
         self.subtitles = []
 
-        # Split on 2 or more lines in a row
-        sub_contents = regex.split(r'\n{2,}', text)
-
         previous_sub = None
-        for sub_content in sub_contents:
-            subtitle = Subtitle(sub_content, language, is_source, should_sterilize=sterilize,
-                                find_sentence_boundaries=Config.FindSentenceBoundaries)
-            if subtitle is not None:
-                self.subtitles.append(subtitle)
-                if previous_sub is not None:
-                    subtitle.previous = previous_sub
-                    previous_sub.subsequent = subtitle
-                previous_sub = subtitle
+        batch = list(islice(sub_contents, self.BATCH_SIZE))
+        while len(batch) > 0:
+            # Parse every timecode line in the batch in one go. Subtitles left at -1 parse their own.
+            time_code_lines = [(sub_content.split('\n', 2) + [''])[1] for sub_content in batch]
+            starts, ends = parse_time_code_lines(time_code_lines)
+
+            for sub_content, time_code_line, start, end in zip(batch, time_code_lines, starts.tolist(),
+                                                               ends.tolist()):
+                time_codes = (start, end, time_code_line.strip()) if start >= 0 else None
+                subtitle = Subtitle(sub_content, language, is_source, should_sterilize=sterilize,
+                                    find_sentence_boundaries=Config.FindSentenceBoundaries, time_codes=time_codes)
+                if subtitle is not None:
+                    self.subtitles.append(subtitle)
+                    if previous_sub is not None:
+                        subtitle.previous = previous_sub
+                        previous_sub.subsequent = subtitle
+                    previous_sub = subtitle
+            batch = list(islice(sub_contents, self.BATCH_SIZE))
 
         self.utterances = find_utterances(self.subtitles)
+        # Built on first lookup by time
+        self._utterance_index = None
+
+    @classmethod
+    def from_file(cls, filename, language, is_source=True, sterilize=Config.Sterilize) -> "Subtitles":
+        """
+        Read subtitles block by block from an .srt or .srt.gz file instead of loading the whole text first
+        """
+        return cls(read_srt_blocks(filename), language, is_source, sterilize)
+
+    def table(self) -> SubtitleTable:
+        """
+        Column-oriented snapshot of these subtitles. Build it again after changing timecodes.
+        """
+        return SubtitleTable.from_subtitles(self.subtitles, self.is_source)
 
     def find_utterances_for_sub(self, subtitle) -> list[Utterance]:
         return [u for u in self.utterances if subtitle in u.subtitles]
 
     def find_utterances_by_time(self, start, end) -> list[Utterance]:
-        return [u for u in self.utterances if u.end() >= start and u.start() <= end]
+        return self.utterance_index().find_by_time(start, end)
+
+    def utterance_index(self) -> UtteranceIndex:
+        if self._utterance_index is None or self._utterance_index.utterances is not self.utterances:
+            self._utterance_index = UtteranceIndex(self.utterances)
+        return self._utterance_index
+
+    def invalidate_utterance_index(self):
+        """
+        Must be called after utterances are merged or their subtitles' timecodes change
+        """
+        self._utterance_index = None
 
     def align(self, target):
         # collated = collate_subs(self.subtitles, target.subtitles)
@@ -55,6 +102,7 @@ class Subtitles:
         #     if len(partition.source.utterances) > 0 and len(partition.target.utterances) > 0:
         #         pairs.append([str(partition.source), str(partition.target)])
         # return pairs
+        target.invalidate_utterance_index()
         previous = None
         pairs = []
         for utterance in self.utterances:
@@ -77,25 +125,26 @@ class Subtitles:
 
         for pair in resolved:
             pair.merge_options()
+        # Merging options changed the spans of target utterances
+        target.invalidate_utterance_index()
 
         return resolved
 
+    def align_by_overlap(self, target) -> list[UtterancePair]:
+        """
+        Vectorized alternative to align. See timecode_overlap.align_by_overlap.
+        """
+        pairs = align_by_overlap(self.utterances, target.utterances)
+        target.invalidate_utterance_index()
+        return pairs
+
     def find(self, other: Utterance) -> UtteranceOptions:
         """
         Find the counterpart to a subtitle provided from another language in the current set
         :param other: a target utterance to find the match
         :return: counterpart subtitle or None
         """
-
-        options = []
-        for current in self.utterances:
-            if current.end() < other.start():
-                continue
-            elif current.start() > other.end():
-                break
-            else:
-                options.append(current)
-        return UtteranceOptions(options)
+        return UtteranceOptions(self.utterance_index().find(other.start(), other.end()))
 
     @staticmethod
     def _find_best(source, options):
@@ -0,0 +1,110 @@
+import numpy as np
+
+from src.subtitle import MICROSECONDS_PER_SECOND
+from src.subtitle_table import SubtitleTable
+
+# Seconds a target sentence may lie outside of a source sentence and still be considered
+DEFAULT_TOLERANCE = 2
+DEFAULT_MAX_OFFSET = 60
+# Step in seconds between offsets tried by detect_offset
+OFFSET_RESOLUTION = 0.5
+
+
+def sentence_spans(indices: [[int]], table: SubtitleTable) -> (np.ndarray, np.ndarray):
+    """
+    Timecodes of sentences from the subtitle indices listed in a .sent-index file
+    :return: start and end of each sentence, in microseconds
+    """
+    rows = dict(zip(table.indices.tolist(), range(len(table))))
+    starts = np.zeros(len(indices), dtype=np.int64)
+    ends = np.zeros(len(indices), dtype=np.int64)
+    previous = 0
+    for i, subtitle_indices in enumerate(indices):
+        found = [rows[index] for index in subtitle_indices if index in rows]
+        if len(found):
+            starts[i] = table.starts[found].min()
+            ends[i] = table.ends[found].max()
+        else:
+            # Sentences without subtitles get an empty span where the previous one ended
+            starts[i] = ends[i] = previous
+        previous = ends[i]
+    return starts, ends
+
+
+def _covered_time(starts, ends):
+    """
+    :return: function giving how much of the time before each point is covered by at least one of the spans
+    """
+    order = np.argsort(starts, kind='stable')
+    starts = np.asarray(starts)[order]
+    ends = np.maximum.accumulate(np.asarray(ends)[order])
+    # Merge overlapping spans
+    first = np.ones(len(starts), dtype=bool)
+    first[1:] = starts[1:] > ends[:-1]
+    last = np.ones(len(starts), dtype=bool)
+    last[:-1] = first[1:]
+    merged_starts, merged_ends = starts[first], ends[last]
+    before = np.zeros(len(merged_starts), dtype=np.int64)
+    np.cumsum((merged_ends - merged_starts)[:-1], out=before[1:])
+
+    def covered(points):
+        span = np.searchsorted(merged_starts, points, side='right') - 1
+        inside = np.minimum(points, merged_ends[np.maximum(span, 0)]) - merged_starts[np.maximum(span, 0)]
+        return np.where(span >= 0, before[np.maximum(span, 0)] + inside, 0)
+
+    return covered
+
+
+def detect_offset(source_starts, source_ends, target_starts, target_ends, max_offset=DEFAULT_MAX_OFFSET) -> int:
+    """
+    Shift of the source which overlaps it with the target the most. Every candidate shift within max_offset is
+    scored at once.
+    :param max_offset: largest offset to look for, in seconds
+    :return: offset in microseconds, positive when the target is behind the source
+    """
+    if len(source_starts) == 0 or len(target_starts) == 0:
+        return 0
+    covered = _covered_time(target_starts, target_ends)
+    steps = int(max_offset / OFFSET_RESOLUTION)
+    candidates = np.arange(-steps, steps + 1) * int(OFFSET_RESOLUTION * MICROSECONDS_PER_SECOND)
+    shifted_starts = np.asarray(source_starts)[None, :] + candidates[:, None]
+    shifted_ends = np.asarray(source_ends)[None, :] + candidates[:, None]
+    scores = (covered(shifted_ends) - covered(shifted_starts)).sum(axis=1)
+    # Prefer the smallest shift among equally good ones
+    best = np.flatnonzero(scores == scores.max())
+    return int(candidates[best[np.argmin(np.abs(candidates[best]))]])
+
+
+def timecode_band(source_starts, source_ends, target_starts, target_ends,
+                  tolerance=DEFAULT_TOLERANCE) -> (np.ndarray, np.ndarray):
+    """
+    Search band for aligner.align where each source sentence can only be aligned with target sentences overlapping
+    it within the tolerance. When the subtitles are offset by more than the tolerance, the band is widened to
+    cover the offset.
+    :param tolerance: in seconds
+    :return: lows and highs (exclusive) of the band for each of the len(source_starts) + 1 rows of the DP
+    """
+    source_starts, source_ends = np.asarray(source_starts), np.asarray(source_ends)
+    target_starts, target_ends = np.asarray(target_starts), np.asarray(target_ends)
+    num_source, num_target = len(source_starts), len(target_starts)
+    tolerance = int(tolerance * MICROSECONDS_PER_SECOND)
+    offset = detect_offset(source_starts, source_ends, target_starts, target_ends)
+    if abs(offset) > tolerance:
+        tolerance += abs(offset)
+
+    lows = np.zeros(num_source + 1, dtype=np.int64)
+    highs = np.full(num_source + 1, num_target + 1, dtype=np.int64)
+    if num_target:
+        # First target ending after each source sentence starts, and how many start before it ends
+        lows[1:] = np.searchsorted(np.maximum.accumulate(target_ends), source_starts - tolerance, side='left')
+        highs[:-1] = np.searchsorted(np.maximum.accumulate(target_starts), source_ends + tolerance, side='right') + 1
+
+    # Rows follow source sentence i - 1 and precede source sentence i. Keep both edges moving forward and
+    # consecutive rows overlapping so the end of the documents stays reachable.
+    lows = np.minimum.accumulate(lows[::-1])[::-1]
+    highs = np.maximum.accumulate(highs)
+    lows[1:] = np.minimum(lows[1:], highs[:-1] - 1)
+    lows = np.clip(lows, 0, num_target)
+    highs = np.clip(highs, lows + 1, num_target + 1)
+    lows[0], highs[-1] = 0, num_target + 1
+    return lows, highs
@@ -0,0 +1,87 @@
+import numpy as np
+
+from src.utterance import Utterance
+from src.utterance_options import UtteranceOptions
+from src.utterance_pair import UtterancePair
+
+
+def spans(utterances: [Utterance]) -> (np.ndarray, np.ndarray):
+    """
+    :return: int64 arrays of the start and end of each utterance
+    """
+    starts = np.fromiter((u.start() for u in utterances), dtype=np.int64, count=len(utterances))
+    ends = np.fromiter((u.end() for u in utterances), dtype=np.int64, count=len(utterances))
+    return starts, ends
+
+
+def overlap_pairs(source_starts, source_ends, target_starts, target_ends) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    Sparse, banded overlap matrix between source and target spans. Candidates for each source span are found the same
+    way Subtitles.find walks target utterances in order, but with binary searches over running maximums.
+    :return: row (source) and column (target) of every overlapping pair along with the overlap in microseconds
+    """
+    if len(source_starts) == 0 or len(target_starts) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    # Everything before lo ends before the source starts. The walk stops at hi.
+    lo = np.searchsorted(np.maximum.accumulate(target_ends), source_starts, side='left')
+    hi = np.searchsorted(np.maximum.accumulate(target_starts), source_ends, side='right')
+    counts = np.maximum(hi - lo, 0)
+
+    rows = np.repeat(np.arange(len(source_starts)), counts)
+    first = np.cumsum(counts) - counts
+    cols = lo[rows] + np.arange(len(rows)) - first[rows]
+
+    keep = target_ends[cols] >= source_starts[rows]
+    rows, cols = rows[keep], cols[keep]
+    overlaps = (np.minimum(source_ends[rows], target_ends[cols]) -
+                np.maximum(source_starts[rows], target_starts[cols]))
+    return rows, cols, overlaps
+
+
+def assign_targets(rows, cols, overlaps) -> (np.ndarray, np.ndarray):
+    """
+    Resolve targets claimed by more than one source by giving each to the source it overlaps the most.
+    Ties go to the later source, as in UtterancePair.resolve_multiple_targets.
+    :return: rows and cols of the winning pairs, sorted by row and then col
+    """
+    if len(rows) == 0:
+        return rows, cols
+    # Sort by target, then overlap, then source so the winner is the last entry for each target
+    order = np.lexsort((rows, overlaps, cols))
+    is_last = np.ones(len(order), dtype=bool)
+    is_last[:-1] = cols[order][1:] != cols[order][:-1]
+    winners = order[is_last]
+    winners = winners[np.lexsort((cols[winners], rows[winners]))]
+    return rows[winners], cols[winners]
+
+
+def align_by_overlap(source_utterances: [Utterance], target_utterances: [Utterance]) -> [UtterancePair]:
+    """
+    Timecode-only alignment computed over the whole overlap matrix at once instead of pair by pair.
+    Produces the same UtterancePair output as Subtitles.align. The only difference is that a target spanning
+    three or more source utterances always goes to the one it overlaps the most, rather than being contested
+    between neighbours only.
+    """
+    source_starts, source_ends = spans(source_utterances)
+    target_starts, target_ends = spans(target_utterances)
+    rows, cols, overlaps = overlap_pairs(source_starts, source_ends, target_starts, target_ends)
+    rows, cols = assign_targets(rows, cols, overlaps)
+
+    boundaries = np.searchsorted(rows, np.arange(len(source_utterances) + 1)).tolist()
+    cols = cols.tolist()
+
+    pairs = []
+    previous = None
+    for i, utterance in enumerate(source_utterances):
+        options = [target_utterances[j] for j in cols[boundaries[i]:boundaries[i + 1]]]
+        pair = UtterancePair(previous, utterance, UtteranceOptions(options))
+        pairs.append(pair)
+        if previous is not None:
+            previous.subsequent = pair
+        previous = pair
+
+    for pair in pairs:
+        pair.merge_options()
+
+    return pairs
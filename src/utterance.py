@@ -12,11 +12,16 @@ class Utterance:
     """
     Associates a single utterance with one or more subtitles
     """
+    __slots__ = ('text', 'subtitles', '_start', '_end')
+
     def __init__(self, text, subtitles: [Subtitle]):
         self.text = text
         self.subtitles = set(subtitles)
         for subtitle in self.subtitles:
             subtitle.utterances.add(self)
+        # Span of the subtitles, computed on first use and kept up to date by append and merge
+        self._start = None
+        self._end = None
 
     def __str__(self):
         return self.text
@@ -30,6 +35,9 @@ class Utterance:
     def append(self, subtitle: Subtitle):
         self.subtitles.add(subtitle)
         subtitle.utterances.add(self)
+        if self._start is not None:
+            self._start = min(self._start, subtitle.start)
+            self._end = max(self._end, subtitle.end)
 
     def overlap(self, other: "Utterance"):
         """
@@ -52,12 +60,32 @@ class Utterance:
         for subtitle in self.subtitles:
             subtitle.utterances.add(self)
         self.subtitles.update(other.subtitles)
+        if self._start is not None and other._start is not None:
+            self._start = min(self._start, other._start)
+            self._end = max(self._end, other._end)
+        else:
+            self.invalidate_span()
+
+    def invalidate_span(self):
+        """
+        Forget the cached span. Needed whenever the timecodes of one of the subtitles change.
+        """
+        self._start = None
+        self._end = None
+
+    def _update_span(self):
+        self._start = min(sub.start for sub in self.subtitles)
+        self._end = max(sub.end for sub in self.subtitles)
 
     def start(self) -> int:
-        return min(sub.start for sub in self.subtitles)
+        if self._start is None:
+            self._update_span()
+        return self._start
 
     def end(self) -> int:
-        return max(sub.end for sub in self.subtitles)
+        if self._end is None:
+            self._update_span()
+        return self._end
 
     def trails_off(self) -> bool:
         return regex.search(TRAILS_OFF_REGEX, self.text.strip()) is not None
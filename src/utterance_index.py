@@ -0,0 +1,50 @@
+from bisect import bisect_left, bisect_right
+
+from src.utterance import Utterance
+
+
+class UtteranceIndex:
+    """
+    UtteranceIndex finds utterances by time with binary searches while keeping them in their original order.
+    Utterances are mostly, but not strictly, sorted by start time, so the searches run over running maximums
+    and minimums of their spans rather than the spans themselves.
+    """
+
+    def __init__(self, utterances: [Utterance]):
+        self.utterances = utterances
+        starts = [u.start() for u in utterances]
+        ends = [u.end() for u in utterances]
+        self.max_starts = self._running(starts, max)
+        self.max_ends = self._running(ends, max)
+        self.min_starts_after = self._running(starts[::-1], min)[::-1]
+        self.ends = ends
+
+    @staticmethod
+    def _running(values, function):
+        result = []
+        current = None
+        for value in values:
+            current = value if current is None else function(current, value)
+            result.append(current)
+        return result
+
+    def find(self, start, end) -> [Utterance]:
+        """
+        Same as walking the utterances in order, skipping those ending before start
+        and stopping at the first one that starts after end.
+        """
+        # Everything before lo ends before start
+        lo = bisect_left(self.max_ends, start)
+        # The walk stops at the first utterance starting after end
+        hi = bisect_right(self.max_starts, end)
+        return [self.utterances[i] for i in range(lo, hi) if self.ends[i] >= start]
+
+    def find_by_time(self, start, end) -> [Utterance]:
+        """
+        All utterances with end >= start and start <= end, in their original order
+        """
+        lo = bisect_left(self.max_ends, start)
+        # Everything from hi onwards starts after end
+        hi = bisect_right(self.min_starts_after, end)
+        return [self.utterances[i] for i in range(lo, hi)
+                if self.ends[i] >= start and self.utterances[i].start() <= end]
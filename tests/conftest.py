@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from src.embedding_cache import EMBEDDING_DIM, text_key
+
+
+class FakeEncoder:
+    """
+    Stands in for the LASER encoder. Each text gets its own vector, the same every time, so the DP has something to
+    align, and every batch and text encoded is recorded.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+        self.batches = []
+        self.encoded = []
+
+    @property
+    def calls(self) -> int:
+        return len(self.batches)
+
+    def encode(self, sentences, language=None):
+        self.batches.append(list(sentences))
+        self.encoded.extend(sentences)
+        vectors = [np.random.default_rng(text_key(sentence)).normal(size=self.dim) for sentence in sentences]
+        return np.array(vectors, dtype=np.float32).reshape(-1, self.dim)
+
+
+@pytest.fixture
+def make_encoder():
+    return FakeEncoder
+
+
+@pytest.fixture
+def encoder(make_encoder):
+    return make_encoder()
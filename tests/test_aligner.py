@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from src.aligner import align, alignment_types, diagonal_band
+
+
+def stack_overlaps(vectors, num_overlaps=4):
+    """
+    Overlap embeddings like doc_embedding produces, using the sum of the sentence vectors. Each run is indexed by
+    its last sentence and the padding in front gets random vectors.
+    """
+    stacked = np.random.default_rng(3).normal(size=(num_overlaps,) + vectors.shape).astype(np.float32)
+    for k in range(num_overlaps):
+        for i in range(k, len(vectors)):
+            stacked[k, i] = vectors[i - k:i + 1].sum(axis=0)
+    return stacked
+
+
+@pytest.fixture
+def source():
+    return np.random.default_rng(1).normal(size=(60, 32)).astype(np.float32)
+
+
+def covers_everything(path, num_source, num_target):
+    source_ids = [i for source_ids, _, _ in path for i in source_ids]
+    target_ids = [j for _, target_ids, _ in path for j in target_ids]
+    return source_ids == list(range(num_source)) and target_ids == list(range(num_target))
+
+
+@pytest.fixture
+def noise(source):
+    return np.random.default_rng(2).normal(scale=0.2, size=source.shape).astype(np.float32)
+
+
+def test_similar_documents_align_along_the_diagonal(source, noise):
+    path = align(stack_overlaps(source), stack_overlaps(source + noise))
+    assert covers_everything(path, len(source), len(source))
+    assert all(s == t for s, t, _ in path)
+    assert sum(len(s) == 1 for s, _, _ in path) > 0.9 * len(path)
+
+
+def test_merged_sentences_align_many_to_one(source, noise):
+    target = source + noise
+    target = np.vstack([target[:10], target[10:12].sum(axis=0, keepdims=True), target[12:]])
+    path = align(stack_overlaps(source), stack_overlaps(target))
+    assert covers_everything(path, len(source), len(target))
+    assert ([10, 11], [10]) in [(s, t) for s, t, _ in path]
+
+
+def test_empty_side_is_deleted(source):
+    path = align(stack_overlaps(source[:2]), np.zeros((4, 0, 32), dtype=np.float32))
+    assert path == [([0], [], 0.0), ([1], [], 0.0)]
+
+
+def test_band_reaches_both_corners():
+    lows, highs = diagonal_band(10, 100, width=2)
+    assert lows[0] == 0 and highs[-1] == 101
+    assert (lows[1:] < highs[:-1]).all()
+
+
+def test_alignment_types_respect_max_size():
+    types = alignment_types(4, 4)
+    assert (0, 1) in types and (1, 0) in types and (2, 2) in types
+    assert all(x + y <= 4 for x, y in types)
@@ -0,0 +1,68 @@
+import shutil
+
+import pytest
+from src import pipeline
+from src.artifacts import ArtifactStore, file_key
+from src.embedding_cache import EmbeddingCache, CachedEncoder
+
+
+@pytest.fixture
+def srt_files(tmp_path):
+    source, target = tmp_path / 'en.srt', tmp_path / 'es.srt'
+    shutil.copy('test_data/partition_en.srt', source)
+    shutil.copy('test_data/partition_es.srt', target)
+    return str(source), str(target)
+
+
+@pytest.fixture
+def aligned(monkeypatch):
+    calls = []
+
+    def fake_align(source, target, source_embeddings, target_embeddings, **kwargs):
+        calls.append(len(source))
+        return [([i], [i], 0.0) for i in range(min(len(source), len(target)))]
+
+    monkeypatch.setattr(pipeline, 'align_documents', fake_align)
+    return calls
+
+
+def delay_by_an_hour(srt_file):
+    with open(srt_file, 'r', encoding='utf-8') as file:
+        contents = file.read()
+    with open(srt_file, 'w', encoding='utf-8') as file:
+        file.write(contents.replace('00:1', '01:1').replace('00:2', '01:2'))
+
+
+def align(srt_files, encoder, store):
+    return pipeline.align_pair(*srt_files, encoder=encoder, store=store, source_language='english',
+                               target_language='spanish')
+
+
+def test_unchanged_pair_is_not_realigned(srt_files, aligned, encoder, tmp_path):
+    store = ArtifactStore(str(tmp_path / 'artifacts'), 'test')
+    first, _, _ = align(srt_files, encoder, store)
+    encoded = len(encoder.encoded)
+    second, _, _ = align(srt_files, encoder, store)
+    assert first == second
+    assert len(aligned) == 1
+    assert len(encoder.encoded) == encoded
+
+
+def test_fixed_timecodes_are_realigned_without_embedding(srt_files, aligned, encoder, tmp_path):
+    store = ArtifactStore(str(tmp_path / 'artifacts'), 'test')
+    align(srt_files, encoder, store)
+    encoded = len(encoder.encoded)
+    key = file_key(srt_files[1])
+    delay_by_an_hour(srt_files[1])
+    assert file_key(srt_files[1]) != key
+    align(srt_files, encoder, store)
+    assert len(aligned) == 2
+    assert len(encoder.encoded) == encoded
+
+
+def test_cached_encoder_is_not_cached_twice(srt_files, aligned, encoder, tmp_path):
+    store = ArtifactStore(str(tmp_path / 'artifacts'), 'test')
+    align(srt_files, CachedEncoder(encoder, EmbeddingCache(str(tmp_path / 'cache'), 'test')), store)
+    assert len(encoder.encoded)
+    assert list((tmp_path / 'cache' / 'test').iterdir())
+    assert not list((tmp_path / 'artifacts' / 'embeddings' / 'test').iterdir())
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+from src.catalog import Catalog
+
+SUBTITLES = [(1, 2024, 'Scream', 'eng'), (2, 2024, 'Scream', 'spa'), (3, 2024, 'Scream', 'ger'),
+             (4, 2024, 'Scream', 'eng'), (5, 2024, 'Wicked', 'eng'), (6, 2024, 'Wicked', 'spa'),
+             (7, 2023, 'Barbie', 'eng'), (8, 2023, 'Barbie', 'spa'), (9, 2023, 'Barbie', 'ger')]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = Catalog(str(tmp_path / 'catalog.db'))
+    # Enough languages for bitmaps longer than a byte
+    extra = [(100 + i, 2022, 'Polyglot', f'l{i:02d}', None) for i in range(10)]
+    subtitles = [(i, year, title, lang, f'{year}/{title}/{lang}/{i}.srt') for i, year, title, lang in SUBTITLES]
+    catalog.add(subtitles + extra)
+    catalog.rebuild()
+    yield catalog
+    catalog.close()
+
+
+def test_titles_having_all_languages(catalog):
+    assert catalog.titles_having(['eng', 'spa', 'ger']) == [(2023, 'Barbie'), (2024, 'Scream')]
+    assert catalog.titles_having(['eng', 'spa'], year=2024) == [(2024, 'Scream'), (2024, 'Wicked')]
+    assert catalog.count_having(['l09']) == 1
+    assert catalog.count_having(['eng', 'xxx']) == 0
+
+
+def test_files_of_a_title(catalog):
+    assert catalog.files(2024, 'Scream', 'eng') == ['2024/Scream/eng/1.srt', '2024/Scream/eng/4.srt']
+
+
+def test_catalog_imported_directory(tmp_path):
+    for year, title, lang, subtitle_id in [('2024', 'Scream', 'eng', '1'), ('2024', 'Scream', 'spa', '2')]:
+        os.makedirs(tmp_path / 'data' / year / title / lang)
+        (tmp_path / 'data' / year / title / lang / f'{subtitle_id}.srt').write_text('')
+    catalog = Catalog(str(tmp_path / 'catalog.db'))
+    catalog.add_directory(str(tmp_path / 'data'))
+    catalog.rebuild()
+    assert catalog.titles_having(['spa', 'eng']) == [(2024, 'Scream')]
+    catalog.close()
@@ -0,0 +1,33 @@
+import pytest
+from src.corpus import Manifest, DONE, FAILED, write_shard, has_shard, merge_shards
+
+
+@pytest.fixture
+def shard_dir(tmp_path):
+    return str(tmp_path / 'shards')
+
+
+def test_manifest_resumes_with_latest_status(tmp_path):
+    filename = str(tmp_path / 'corpus.manifest')
+    manifest = Manifest(filename)
+    manifest.record('Scream', FAILED)
+    manifest.record('Wicked', DONE, 12)
+    manifest.record('Scream', DONE, 3)
+    with open(filename, 'a') as file:
+        file.write('Anora\tdo')
+    resumed = Manifest(filename)
+    assert resumed.status('Scream') == DONE and resumed.count('Scream') == 3
+    assert resumed.count('Wicked') == 12
+    assert resumed.status('Anora') is None
+
+
+def test_shards_merge_in_title_order(tmp_path, shard_dir):
+    write_shard(shard_dir, 'B', 'eng', 'spa', [('Yes.', 'Sí.')])
+    write_shard(shard_dir, 'A', 'eng', 'spa', [('Hello.', 'Hola.'), ('Two\nlines.', 'Dos\nlíneas.')])
+    assert has_shard(shard_dir, 'A', 'eng', 'spa') and not has_shard(shard_dir, 'C', 'eng', 'spa')
+    source, target = str(tmp_path / 'all.eng'), str(tmp_path / 'all.spa')
+    assert merge_shards(shard_dir, ['A', 'B'], 'eng', 'spa', source, target) == 3
+    with open(source) as file:
+        assert file.read() == 'Hello.\nTwo lines.\nYes.\n'
+    with open(target) as file:
+        assert file.read() == 'Hola.\nDos líneas.\nSí.\n'
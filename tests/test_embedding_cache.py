@@ -0,0 +1,84 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+from src.embedding_cache import EmbeddingCache, CachedEncoder, text_key
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / 'cache')
+
+
+@pytest.fixture
+def encoder(make_encoder):
+    return make_encoder(dim=2)
+
+
+def test_only_new_lines_are_encoded(encoder, cache_dir):
+    cached = CachedEncoder(encoder, EmbeddingCache(cache_dir, 'test', dim=2))
+    first = cached.encode(['Yes.', 'What?', 'Yes.'], 'eng')
+    assert encoder.encoded == ['Yes.', 'What?']
+    second = cached.encode(['What?', 'Thank you.'], 'eng')
+    assert encoder.encoded == ['Yes.', 'What?', 'Thank you.']
+    assert np.array_equal(first[1], second[0])
+    assert np.array_equal(first[0], first[2])
+
+
+def test_languages_are_cached_separately(encoder, cache_dir):
+    cached = CachedEncoder(encoder, EmbeddingCache(cache_dir, 'test', dim=2))
+    cached.encode(['Hallo.'], 'ger')
+    cached.encode(['Hallo.'], 'dut')
+    assert encoder.encoded == ['Hallo.', 'Hallo.']
+
+
+def test_cache_persists_on_disk(encoder, cache_dir):
+    expected = CachedEncoder(encoder, EmbeddingCache(cache_dir, 'test', dim=2)).encode(['Yes.', 'No.'], 'eng')
+    reopened = CachedEncoder(encoder, EmbeddingCache(cache_dir, 'test', dim=2, memory_size=1))
+    assert np.array_equal(reopened.encode(['No.', ' Yes. '], 'eng'), expected[::-1])
+    assert encoder.encoded == ['Yes.', 'No.']
+
+
+def test_key_ignores_whitespace():
+    assert text_key('Thank  you.\n') == text_key('Thank you.')
+    assert text_key('Thank you.') != text_key('Thank you!')
+
+
+def test_caches_sharing_a_directory_keep_rows_apart(make_encoder, cache_dir):
+    encoder = make_encoder(dim=2)
+    # Nothing kept in memory, so every vector is read from the row each cache thinks it's in
+    first = CachedEncoder(encoder, EmbeddingCache(cache_dir, 'test', dim=2, memory_size=0))
+    second = CachedEncoder(encoder, EmbeddingCache(cache_dir, 'test', dim=2, memory_size=0))
+    expected = make_encoder(dim=2).encode(['Yes.', 'No.', 'Maybe.'])
+    first.encode(['Yes.'], 'eng')
+    second.encode(['No.'], 'eng')
+    first.encode(['Maybe.'], 'eng')
+    assert np.array_equal(first.encode(['Yes.', 'Maybe.'], 'eng'), expected[[0, 2]])
+    # The first cache finds the second's row instead of writing its own
+    assert np.array_equal(first.encode(['No.'], 'eng'), expected[1:2])
+    assert np.array_equal(second.encode(['Yes.', 'No.', 'Maybe.'], 'eng'), expected)
+    assert encoder.encoded == ['Yes.', 'No.', 'Maybe.']
+
+
+def encode_in_batches(encoder_class, cache_dir, texts):
+    cached = CachedEncoder(encoder_class(dim=2), EmbeddingCache(cache_dir, 'test', dim=2, memory_size=0))
+    for i in range(0, len(texts), 3):
+        cached.encode(texts[i:i + 3], 'eng')
+    if not np.array_equal(cached.encode(texts, 'eng'), encoder_class(dim=2).encode(texts)):
+        raise (Exception('Read back the wrong embeddings'))
+
+
+def test_processes_share_a_cache(make_encoder, cache_dir):
+    texts = [f'Sentence {i}.' for i in range(200)]
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=encode_in_batches, args=(make_encoder, cache_dir, texts[i::4] + texts[:20]))
+                 for i in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+    encoder = make_encoder(dim=2)
+    cached = CachedEncoder(encoder, EmbeddingCache(cache_dir, 'test', dim=2))
+    assert np.array_equal(cached.encode(texts, 'eng'), make_encoder(dim=2).encode(texts))
+    assert encoder.encoded == []
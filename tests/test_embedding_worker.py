@@ -0,0 +1,80 @@
+import os
+import socket
+import tempfile
+import threading
+
+import pytest
+from src.embedding_worker import EmbeddingWorker, WorkerEncoder
+
+
+@pytest.fixture
+def expected(make_encoder):
+    def embed(sentences):
+        return make_encoder(dim=2).encode(sentences).tolist()
+
+    return embed
+
+
+@pytest.fixture
+def worker(make_encoder):
+    # Unix socket paths are limited in length, so don't use pytest's tmp_path
+    directory = tempfile.mkdtemp()
+    worker = EmbeddingWorker(make_encoder(dim=2), os.path.join(directory, 'worker.sock'), batch_size=4, max_wait=0.5)
+    worker.start()
+    yield worker
+    worker.stop()
+    os.rmdir(directory)
+
+
+def test_client_gets_embeddings_in_order(worker, expected):
+    client = WorkerEncoder(worker.socket_path)
+    sentences = ['Thank you.', 'Yes.', 'What is going on here?']
+    embeddings = client.encode(sentences, 'eng')
+    assert embeddings.tolist() == expected(sentences)
+    assert client.encode([], 'eng').shape[0] == 0
+    client.close()
+
+
+def test_concurrent_requests_share_batches(worker, expected):
+    sentences = [['Yes.', 'A much longer sentence.'], ['No.', 'Another long sentence here.']]
+    results = [None, None]
+
+    def run(i):
+        client = WorkerEncoder(worker.socket_path)
+        results[i] = client.encode(sentences[i], 'eng')
+        client.close()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for result, batch in zip(results, sentences):
+        assert result.tolist() == expected(batch)
+    # Both requests were merged into one batch, shortest sentences first
+    assert worker.encoder.batches == [['No.', 'Yes.', 'A much longer sentence.', 'Another long sentence here.']]
+
+
+def test_live_worker_keeps_its_socket(worker, make_encoder, expected):
+    with pytest.raises(Exception, match='already serving'):
+        EmbeddingWorker(make_encoder(dim=2), worker.socket_path).start()
+    client = WorkerEncoder(worker.socket_path)
+    assert client.encode(['Yes.'], 'eng').tolist() == expected(['Yes.'])
+    client.close()
+
+
+def test_stale_socket_is_replaced(make_encoder, expected):
+    directory = tempfile.mkdtemp()
+    socket_path = os.path.join(directory, 'worker.sock')
+    # Bound but never listening, like the socket of a worker which was killed
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    worker = EmbeddingWorker(make_encoder(dim=2), socket_path)
+    worker.start()
+    client = WorkerEncoder(socket_path)
+    assert client.encode(['Yes.'], 'eng').tolist() == expected(['Yes.'])
+    client.close()
+    worker.stop()
+    os.rmdir(directory)
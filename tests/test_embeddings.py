@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from src.embeddings import OverlapIndex, load_embeddings, read_embeddings, doc_embedding
+from src.pipeline import yield_overlaps
+
+
+@pytest.fixture
+def sentences():
+    return ['Yes.', 'What?', 'Thank you.', 'Goodbye.']
+
+
+@pytest.fixture
+def overlap_files(tmp_path, sentences):
+    overlaps = sorted(set(yield_overlaps(sentences, 2)))
+    overlap_file = tmp_path / 'eng.overlap'
+    emb_file = tmp_path / 'eng.emb'
+    overlap_file.write_text(''.join(line + '\n' for line in overlaps), encoding='utf-8')
+    embeddings = np.arange(len(overlaps) * 4, dtype=np.float32).reshape(-1, 4)
+    embeddings.tofile(emb_file)
+    return str(overlap_file), str(emb_file), overlaps, embeddings
+
+
+def test_load_embeddings_is_memory_mapped(overlap_files):
+    _, emb_file, _, embeddings = overlap_files
+    loaded = load_embeddings(emb_file, dim=4)
+    assert isinstance(loaded, np.memmap)
+    assert np.array_equal(loaded, embeddings)
+
+
+def test_index_finds_rows(overlap_files):
+    overlap_file, emb_file, overlaps, _ = overlap_files
+    index, _ = read_embeddings(overlap_file, emb_file, dim=4)
+    assert index.rows(overlaps).tolist() == list(range(len(overlaps)))
+    assert index.row('Not there.') == -1
+    assert OverlapIndex([]).row('Yes.') == -1
+
+
+def vecalign_layer(lines, num_overlaps):
+    """
+    vecalign's layer(), which front-pads each overlap so a run is indexed by its last sentence
+    """
+    return ['PAD'] * min(num_overlaps - 1, len(lines)) + [' '.join(lines[i:i + num_overlaps])
+                                                          for i in range(len(lines) - num_overlaps + 1)]
+
+
+def test_doc_embedding_matches_vecalign_layout(overlap_files, sentences):
+    overlap_file, emb_file, overlaps, embeddings = overlap_files
+    index, loaded = read_embeddings(overlap_file, emb_file, dim=4)
+    vecs = doc_embedding(index, loaded, sentences, 3)
+    sent2line = dict((line, i) for i, line in enumerate(overlaps))
+    for overlap in (1, 2, 3):
+        for j, line in enumerate(vecalign_layer(sentences, overlap)):
+            if line in sent2line:
+                assert np.array_equal(vecs[overlap - 1, j], embeddings[sent2line[line]])
+            else:
+                # Padding, and three sentence overlaps which weren't embedded, get random unit vectors
+                assert np.isclose(np.linalg.norm(vecs[overlap - 1, j]), 1)
+    assert np.array_equal(vecs[1, 1], embeddings[sent2line['Yes. What?']])
+    assert np.allclose(np.linalg.norm(vecs[2], axis=1), 1)
+
+
+def test_doc_embedding_pads_short_documents(overlap_files):
+    overlap_file, emb_file, overlaps, embeddings = overlap_files
+    index, loaded = read_embeddings(overlap_file, emb_file, dim=4)
+    vecs = doc_embedding(index, loaded, ['Yes.'], 3)
+    assert np.array_equal(vecs[0, 0], embeddings[overlaps.index('Yes.')])
+    assert np.allclose(np.linalg.norm(vecs[1:, 0], axis=1), 1)
@@ -0,0 +1,36 @@
+import pytest
+from src.helpers import get_text, collate_subs, find_in_range, find_all
+from src.interval_index import IntervalIndex
+from src.subtitles import Subtitles
+
+
+@pytest.fixture
+def collated():
+    en_text = get_text('test_data/partition2_en.srt')
+    es_text = get_text('test_data/partition2_es.srt')
+    return collate_subs(Subtitles(en_text, 'eng').subtitles, Subtitles(es_text, 'spa', False).subtitles)
+
+
+def test_index_matches_linear_scan(collated):
+    index = IntervalIndex(collated)
+    assert len(index) == len(collated)
+    first = collated[0].start
+    last = max(sub.end for sub in collated)
+    step = (last - first) // 50
+    for start in range(first - step, last + step, step):
+        for length in [1, step // 2, step, step * 5]:
+            expected = find_in_range(collated, start, start + length)
+            assert find_in_range(index, start, start + length) == expected
+
+
+def test_index_ignores_touching_subtitles(collated):
+    index = IntervalIndex(collated)
+    subtitle = collated[0]
+    assert subtitle not in index.find(subtitle.end, subtitle.end + 1)
+    assert subtitle not in index.find(subtitle.start - 1, subtitle.start)
+
+
+def test_find_all_accepts_list_or_index(collated):
+    subtitle = collated[0]
+    assert set(find_all(collated, subtitle.start, subtitle.end)) == \
+        set(find_all(IntervalIndex(collated), subtitle.start, subtitle.end))
@@ -0,0 +1,57 @@
+import gzip
+import os
+
+import pytest
+from src.opensubtitles import ExportTable, clean_title, extract, shard_path
+
+HEADER = '\t'.join(['IDSubtitle', 'IDSubtitleFile', 'ISO639', 'c3', 'c4', 'c5', 'c6', 'MovieName', 'MovieYear',
+                    'c9', 'c10', 'c11', 'c12', 'SeriesSeason', 'SeriesEpisode'])
+
+
+def export_line(subtitle_id, language, title, year, season='0', episode='0'):
+    return '\t'.join(['1', str(subtitle_id), language, '', '', '', '', title, str(year), '', '', '', '',
+                      season, episode])
+
+
+@pytest.fixture
+def table(tmp_path):
+    filename = tmp_path / 'export.txt'
+    filename.write_text('\n'.join([HEADER,
+                                   export_line(154923432, 'eng', 'Scream  VI', 2023),
+                                   export_line(154923433, 'spa', 'Scream  VI', 2023),
+                                   export_line(154923434, 'ger', 'Scream  VI', 2023),
+                                   export_line(154923435, 'eng', 'Empty Movie (SubScene)', 2023),
+                                   export_line(154923436, 'eng', 'Shogun: Anjin', 2024, '1', '1')]) + '\n')
+    return ExportTable.from_file(str(filename))
+
+
+def test_shard_path_and_title_match_the_shell_importer():
+    assert shard_path('files', 154923432) == os.path.join('files', '2', '3', '4', '3', '154923432.gz')
+    assert clean_title('Scream  VI') == 'Scream_VI'
+    assert clean_title('Shōgun: "Anjin"') == 'Shgun_Anjin'
+
+
+def test_select_by_year_and_language(table):
+    assert len(table) == 5
+    rows = table.select(2023, 2023, {'eng', 'spa'})
+    assert table.ids[rows].tolist() == [154923432, 154923433]
+    assert table.select(first_year=2024).tolist() == [4]
+
+
+def test_info_describes_films_and_series(table, tmp_path):
+    assert table.info(0) == 'TITLE: Scream  VI\nYEAR: 2023\nID: 154923432\nTYPE: FILM\n'
+    assert table.info(4).endswith('TYPE: SERIES\nSEASON: 1\nEPISODE: 1\n')
+    assert table.destination('out', 1) == os.path.join('out', '2023', 'Scream_VI', 'spa', '154923433.srt')
+
+
+def test_extract_skips_existing_files(tmp_path):
+    source = str(tmp_path / '154923432.gz')
+    with gzip.open(source, 'wt', encoding='utf-8') as file:
+        file.write('1\n00:00:01,000 --> 00:00:02,000\nHello.\n')
+    destination = str(tmp_path / 'out' / 'eng' / '154923432.srt')
+    assert extract((source, destination)) == (destination, None)
+    with open(destination, encoding='utf-8') as file:
+        assert file.read().endswith('Hello.\n')
+    os.remove(source)
+    assert extract((source, destination)) == (destination, None)
+    assert extract((source, destination + '.missing'))[1].startswith('Missing')
@@ -0,0 +1,36 @@
+from src.embedding_cache import text_key
+from src.overlap_spans import OverlapSpans, span_keys, BLANK_LINE
+from src.pipeline import yield_overlaps
+
+
+def test_span_keys_match_joined_text():
+    sentences = ['Yes.', 'What  do you\nmean?', 'Thank you.']
+    keys = span_keys(sentences, 3)
+    for length in range(1, 4):
+        for start in range(len(sentences) - length + 1):
+            assert keys[length - 1, start] == text_key(' '.join(sentences[start:start + length]))
+    assert keys[2, 1] == 0
+
+
+def test_blank_sentences_match_their_overlap_text():
+    sentences = ['Yes.', ' ', 'Thank you.']
+    spans = OverlapSpans()
+    spans.add(sentences, 0, 2)
+    texts = list(spans.texts(sentences))
+    assert texts == ['Yes.', BLANK_LINE, 'Thank you.', f'Yes. {BLANK_LINE}', f'{BLANK_LINE} Thank you.']
+    assert spans.keys == [text_key(text) for text in texts]
+    assert span_keys(sentences, 2)[1, 0] == text_key(texts[3])
+
+
+def test_spans_are_distinct_and_stay_within_partitions():
+    first, second = ['Yes.', 'No.', 'Yes.'], ['No.', 'Maybe.']
+    spans = OverlapSpans()
+    spans.add(first, 0, 2)
+    spans.add(second, len(first), 2)
+    sentences = first + second
+    texts = list(spans.texts(sentences))
+    assert len(texts) == len(set(texts))
+    assert set(texts) == set(yield_overlaps(first, 2)) | set(yield_overlaps(second, 2))
+    # Shortest first within each partition, in the order the sentences appear
+    assert texts == ['Yes.', 'No.', 'Yes. No.', 'No. Yes.', 'Maybe.', 'No. Maybe.']
+    assert spans.keys == [text_key(text) for text in texts]
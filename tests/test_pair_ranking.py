@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from src.pair_ranking import read_timecodes, score_pair, top_pairs
+from src.subtitle import microseconds_to_string
+
+SECOND = 1000000
+
+
+def write_srt(filename, starts, ends):
+    with open(filename, 'w', encoding='utf-8') as file:
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            file.write(f'{i + 1}\n{microseconds_to_string(start)} --> {microseconds_to_string(end)}\nLine {i}.\n\n')
+    return str(filename)
+
+
+@pytest.fixture
+def spans():
+    gaps = np.random.default_rng(0).integers(2, 8, size=300)
+    starts = np.cumsum(gaps) * SECOND
+    return starts, starts + 2 * SECOND
+
+
+def test_read_timecodes(tmp_path, spans):
+    starts, ends = read_timecodes(write_srt(tmp_path / 'a.srt', *spans))
+    assert starts.tolist() == spans[0].tolist() and ends.tolist() == spans[1].tolist()
+
+
+def test_drift_between_frame_rates_is_detected(tmp_path, spans):
+    drift = 25 / 23.976
+    source = write_srt(tmp_path / 'source.srt', *spans)
+    drifted = [(timecodes * drift).astype(np.int64) for timecodes in spans]
+    target = write_srt(tmp_path / 'target.srt', *drifted)
+    pair_score = score_pair(source, target)
+    assert pair_score.drift == pytest.approx(drift)
+    assert pair_score.overlap > 0.95
+
+
+def test_matching_release_ranks_first(tmp_path, spans):
+    source = write_srt(tmp_path / 'source.srt', *spans)
+    shifted = write_srt(tmp_path / 'shifted.srt', spans[0] + 5 * SECOND, spans[1] + 5 * SECOND)
+    partial = write_srt(tmp_path / 'partial.srt', spans[0][:150], spans[1][:150])
+    other_starts = np.cumsum(np.random.default_rng(1).integers(2, 8, size=300)) * SECOND
+    other = write_srt(tmp_path / 'other.srt', other_starts, other_starts + 2 * SECOND)
+    assert top_pairs([source], [other, partial, shifted], k=1) == [(source, shifted)]
+    # Unrelated timecodes overlap by chance, which doesn't count
+    assert score_pair(source, other).overlap < 0.2
@@ -0,0 +1,32 @@
+import pytest
+from src.helpers import get_text, collate_subs, find_partitions_by_gap_size
+from src.subtitles import Subtitles
+
+
+@pytest.fixture
+def collated():
+    en_text = get_text('test_data/partition_en.srt')
+    es_text = get_text('test_data/partition_es.srt')
+    return collate_subs(Subtitles(en_text, 'eng').subtitles, Subtitles(es_text, 'spa', False).subtitles)
+
+
+def test_partitions_include_trailing_section(collated):
+    partitions = find_partitions_by_gap_size(collated, 3)
+    assert len(partitions) == 2
+    assert sum(len(partition) for partition in partitions) == len(collated)
+
+    last_partition = partitions[-1]
+    assert len(last_partition.source.subtitles) == 1
+    assert len(last_partition.target.subtitles) == 1
+    assert last_partition.source.has_utterances()
+    assert last_partition.target.has_utterances()
+
+
+def test_gap_longer_than_any_pause_yields_one_partition(collated):
+    partitions = find_partitions_by_gap_size(collated, 60)
+    assert len(partitions) == 1
+    assert len(partitions[0]) == len(collated)
+
+
+def test_no_subtitles_yields_no_partitions():
+    assert find_partitions_by_gap_size([], 3) == []
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from src import pipeline
+from src.pipeline import Document, extract_documents, aligned_sentences, path_lines, output_files
+
+
+@pytest.fixture
+def documents():
+    return extract_documents('test_data/partition_en.srt', 'test_data/partition_es.srt',
+                             source_language='english', target_language='spanish')
+
+
+def test_overlaps_stay_within_partitions(documents):
+    source, _ = documents
+    assert len(source.partition_offsets) > 1
+    bounds = source.partition_offsets + [len(source)]
+    expected = set()
+    for start, end in zip(bounds, bounds[1:]):
+        expected.update(pipeline.yield_overlaps(source.sentences[start:end], 6))
+    assert sorted(source.overlaps()) == sorted(expected)
+    assert len(source.indices) == len(source.sentences)
+
+
+def test_aligned_sentences_skip_one_sided_alignments():
+    source, target = Document('a.srt', 'eng'), Document('b.srt', 'spa')
+    source.sentences = ['Hello.', 'How are you?']
+    target.sentences = ['Hola.', '¿Cómo estás?']
+    path = [([0], [0], 0.1), ([], [1], 0.0), ([1], [1], 0.2)]
+    assert aligned_sentences(path, source, target) == [('Hello.', 'Hola.'), ('How are you?', '¿Cómo estás?')]
+    assert path_lines(path) == ['[0]:[0]:0.100000', '[]:[1]:0.000000', '[1]:[1]:0.200000']
+
+
+def test_output_files_match_run_vecalign():
+    assert output_files('data/Title/eng/123.srt', 'data/Title/ger/456.srt') == \
+           ('data/Title/eng-ger-vecalign.path', 'data/Title/eng-ger-vecalign.txt')
+    assert output_files('data/Title/eng/123-002.srt', 'data/Title/ger/456-002.srt') == \
+           ('data/Title/eng-ger-vecalign-002.path', 'data/Title/eng-ger-vecalign-002.txt')
+
+
+def test_align_pair_embeds_in_memory(encoder, monkeypatch):
+    def fake_align(source, target, source_embeddings, target_embeddings, **kwargs):
+        assert source_embeddings.shape == (len(source.overlaps()), pipeline.EMBEDDING_DIM)
+        assert target_embeddings.shape == (len(target.overlaps()), pipeline.EMBEDDING_DIM)
+        return [([i], [i], 0.0) for i in range(min(len(source), len(target)))]
+
+    monkeypatch.setattr(pipeline, 'align_documents', fake_align)
+    path, source, target = pipeline.align_pair('test_data/partition_en.srt', 'test_data/partition_es.srt',
+                                               encoder=encoder, source_language='english',
+                                               target_language='spanish')
+    assert encoder.calls == 2
+    assert len(path) == min(len(source), len(target))
+
+
+def test_partitions_are_aligned_separately_and_stitched(documents, monkeypatch):
+    sizes = []
+
+    def fake_vecalign(vecs0, vecs1, alignment_max_size):
+        sizes.append((vecs0.shape[1], vecs1.shape[1]))
+        return [([i], [i], 0.0) for i in range(min(vecs0.shape[1], vecs1.shape[1]))]
+
+    monkeypatch.setattr(pipeline, '_vecalign', fake_vecalign)
+    source, target = documents
+    source_embeddings = np.ones((len(source.overlaps()), pipeline.EMBEDDING_DIM), dtype=np.float32)
+    target_embeddings = np.ones((len(target.overlaps()), pipeline.EMBEDDING_DIM), dtype=np.float32)
+    path = pipeline.align_documents(source, target, source_embeddings, target_embeddings, by_partition=True)
+
+    assert sizes == [(s_end - s_start, t_end - t_start)
+                     for (s_start, s_end), (t_start, t_end) in zip(source.partitions(), target.partitions())]
+    expected = [([s_start + i], [t_start + i], 0.0)
+                for (s_start, s_end), (t_start, t_end) in zip(source.partitions(), target.partitions())
+                for i in range(min(s_end - s_start, t_end - t_start))]
+    assert path == expected
+
+
+def test_align_targets_embeds_source_once(encoder):
+    targets = ['test_data/partition_es.srt', 'test_data/partition2_es.srt']
+    results = pipeline.align_targets('test_data/partition_en.srt', targets, encoder=encoder, workers=2,
+                                     aligner='numpy', source_language='english')
+    assert [target.srt_file for _, _, target in results] == targets
+    # Sources partitioned with different targets share most of their overlaps, which are embedded once
+    source_keys = set().union(*(source.spans.keys for _, source, _ in results))
+    assert len(encoder.encoded) == len(source_keys) + sum(len(target.spans) for _, _, target in results)
+
+
+def test_align_targets_matches_align_pair(make_encoder):
+    # Without partitioning every run is embedded, so no random vectors make the paths differ
+    results = pipeline.align_targets('test_data/partition_en.srt', ['test_data/partition_es.srt',
+                                                                    'test_data/partition2_es.srt'],
+                                     encoder=make_encoder(), workers=2, aligner='numpy', source_language='english',
+                                     partition=False)
+    for path, _, target in results:
+        single, _, _ = pipeline.align_pair('test_data/partition_en.srt', target.srt_file, encoder=make_encoder(),
+                                           aligner='numpy', source_language='english', partition=False)
+        assert path == single
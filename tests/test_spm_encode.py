@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+spm = pytest.importorskip('sentencepiece')
+
+SPM_ENCODE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'spm', 'spm_encode.py')
+
+
+@pytest.fixture
+def model_and_input(tmp_path):
+    lines = [f'Line {i} says {"hello" if i % 2 else "goodbye"} to the {i % 7} people\tand {i % 3} more' for i in
+             range(500)]
+    input_file = tmp_path / 'input.txt'
+    input_file.write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+    spm.SentencePieceTrainer.train(input=str(input_file), model_prefix=str(tmp_path / 'model'), vocab_size=60,
+                                   hard_vocab_limit=False)
+    return str(tmp_path / 'model.model'), str(input_file)
+
+
+def encode_to_stdout(model, input_file, *options) -> bytes:
+    result = subprocess.run([sys.executable, SPM_ENCODE, '--model', model, '--input', input_file, *options],
+                            capture_output=True, check=True)
+    return result.stdout
+
+
+@pytest.mark.parametrize('options', [[], ['--output-format', 'id', '--binary']])
+def test_parallel_encoding_writes_to_stdout(model_and_input, options):
+    model, input_file = model_and_input
+    single = encode_to_stdout(model, input_file, *options)
+    parallel = encode_to_stdout(model, input_file, '--workers', '3', *options)
+    assert len(single)
+    assert parallel == single
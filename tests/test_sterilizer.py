@@ -0,0 +1,27 @@
+from src.subtitle import Sterilizer, sterilize
+
+
+def test_plain_dialogue_is_untouched():
+    assert sterilize(['I was home all night.']) == 'I was home all night.'
+
+
+def test_lines_are_preserved():
+    assert sterilize(['- I was home all night.', "- I don't believe you."]) == \
+        "- I was home all night.\n- I don't believe you."
+
+
+def test_rejects_music_and_urls():
+    sterilizer = Sterilizer()
+    assert sterilizer.sterilize(['♪ I kissed a girl ♪']) == ''
+    assert sterilizer.sterilize(['Subtitles by www.opensubtitles.org']) == ''
+    assert sterilizer.sterilize(['#1 on the list']) == ''
+
+
+def test_strips_bracketed_and_html_content():
+    assert sterilize(['[crying] I beg you']) == 'I beg you'
+    assert sterilize(['{\\an8}Hello (laughs) there']) == 'Hello there'
+    assert sterilize(['<i>Sweep away all monsters and demons!</i>']) == 'Sweep away all monsters and demons!'
+
+
+def test_strips_character_markers():
+    assert sterilize(['JOHN: Get in the car.']) == 'Get in the car.'
@@ -0,0 +1,31 @@
+import gzip
+import shutil
+
+import pytest
+from src.helpers import get_text, read_srt_blocks
+from src.subtitles import Subtitles
+
+
+@pytest.fixture
+def gzipped(tmp_path):
+    path = str(tmp_path / 'carriage_returns.srt.gz')
+    with open('test_data/carriage_returns.srt', 'rb') as source, gzip.open(path, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    return path
+
+
+def test_blocks_match_whole_file_split():
+    for filename in ['test_data/carriage_returns.srt', 'test_data/html.srt', 'test_data/timecode_strings.srt']:
+        text = get_text(filename).replace('\r', '').strip()
+        assert list(read_srt_blocks(filename)) == [block for block in text.split('\n\n') if len(block)]
+
+
+def test_reads_gzipped_subtitles(gzipped):
+    assert list(read_srt_blocks(gzipped)) == list(read_srt_blocks('test_data/carriage_returns.srt'))
+
+
+def test_subtitles_from_file_matches_text():
+    from_text = Subtitles(get_text('test_data/html.srt'), 'eng')
+    from_file = Subtitles.from_file('test_data/html.srt', 'eng')
+    assert [sub.text for sub in from_file] == [sub.text for sub in from_text]
+    assert [u.text for u in from_file.utterances] == [u.text for u in from_text.utterances]
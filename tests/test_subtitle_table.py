@@ -0,0 +1,38 @@
+import pytest
+from src.helpers import get_text, find_in_range
+from src.subtitle_table import SubtitleTable
+from src.subtitles import Subtitles
+
+
+@pytest.fixture
+def subs():
+    return Subtitles(get_text('test_data/html.srt'), 'eng')
+
+
+def test_table_matches_subtitles(subs):
+    table = subs.table()
+    assert len(table) == len(subs.subtitles)
+    for row, sub in enumerate(subs.subtitles):
+        assert table.indices[row] == sub.index
+        assert table.starts[row] == sub.start
+        assert table.ends[row] == sub.end
+        assert table.text(row) == sub.text
+    assert table.texts() == [sub.text for sub in subs.subtitles]
+
+
+def test_table_from_file_matches_subtitles(subs):
+    table = SubtitleTable.from_file('test_data/html.srt', 'eng')
+    assert list(table.starts) == [sub.start for sub in subs.subtitles]
+    assert table.texts() == [sub.text for sub in subs.subtitles]
+
+
+def test_table_find_in_range(subs):
+    table = subs.table()
+    sub = subs.subtitles[3]
+    rows = table.find_in_range(sub.start, sub.end)
+    assert [subs.subtitles[row] for row in rows] == find_in_range(subs.subtitles, sub.start, sub.end)
+
+
+def test_subtitles_have_no_dict(subs):
+    assert not hasattr(subs.subtitles[0], '__dict__')
+    assert not hasattr(subs.utterances[0], '__dict__')
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from src.subtitle_table import SubtitleTable
+from src.timecode_band import detect_offset, sentence_spans, timecode_band
+
+SECOND = 1000000
+
+
+@pytest.fixture
+def source_spans():
+    gaps = np.random.default_rng(0).integers(2, 8, size=25)
+    starts = np.cumsum(gaps) * SECOND
+    return starts, starts + 2 * SECOND
+
+
+def shifted(spans, seconds):
+    return spans[0] + seconds * SECOND, spans[1] + seconds * SECOND
+
+
+def band_contains_overlaps(band, source_spans, target_spans, seconds=0):
+    lows, highs = band
+    for i, (start, end) in enumerate(zip(*shifted(source_spans, seconds))):
+        overlapping = np.flatnonzero((target_spans[1] > start) & (target_spans[0] < end))
+        if len(overlapping) and not (lows[i] <= overlapping.min() < highs[i] and
+                                     lows[i + 1] <= overlapping.max() + 1 < highs[i + 1]):
+            return False
+    return True
+
+
+def test_band_is_narrow_and_covers_overlaps(source_spans):
+    band = timecode_band(*source_spans, *source_spans, tolerance=1)
+    assert band_contains_overlaps(band, source_spans, source_spans)
+    assert (band[1] - band[0]).mean() < 5
+
+
+def test_band_widens_for_offset(source_spans):
+    target_spans = shifted(source_spans, 10)
+    assert detect_offset(*source_spans, *target_spans) == 10 * SECOND
+    band = timecode_band(*source_spans, *target_spans, tolerance=1)
+    assert band_contains_overlaps(band, source_spans, target_spans, seconds=10)
+
+
+def test_band_reaches_both_corners(source_spans):
+    lows, highs = timecode_band(*source_spans, *shifted(source_spans, 200), tolerance=1)
+    assert lows[0] == 0 and highs[-1] == len(source_spans[0]) + 1
+    assert (lows[1:] < highs[:-1]).all()
+
+
+def test_sentence_spans_from_subtitle_indices():
+    table = SubtitleTable([1, 2, 3], [0, 10, 20], [5, 15, 25], ['a', 'b', 'c'])
+    starts, ends = sentence_spans([[1], [2, 3], []], table)
+    assert starts.tolist() == [0, 10, 25]
+    assert ends.tolist() == [5, 25, 25]
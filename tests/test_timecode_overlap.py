@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from src.helpers import get_text
+from src.subtitles import Subtitles
+from src.timecode_overlap import overlap_pairs, assign_targets
+
+
+@pytest.fixture
+def source_spans():
+    return np.array([0, 10, 20, 30]), np.array([10, 20, 30, 40])
+
+
+@pytest.fixture
+def target_spans():
+    return np.array([0, 8, 25, 50]), np.array([8, 25, 35, 60])
+
+
+def test_overlap_pairs_matches_brute_force(source_spans, target_spans):
+    rows, cols, overlaps = overlap_pairs(*source_spans, *target_spans)
+    expected = [(i, j, min(se, te) - max(ss, ts))
+                for i, (ss, se) in enumerate(zip(*source_spans))
+                for j, (ts, te) in enumerate(zip(*target_spans))
+                if te >= ss and ts <= se]
+    assert list(zip(rows.tolist(), cols.tolist(), overlaps.tolist())) == expected
+
+
+def test_assign_targets_to_largest_overlap(source_spans, target_spans):
+    rows, cols = assign_targets(*overlap_pairs(*source_spans, *target_spans))
+    # Target 1 overlaps source 1 the most, target 2 is tied between sources 2 and 3 and goes to the later one
+    assert list(zip(rows.tolist(), cols.tolist())) == [(0, 0), (1, 1), (3, 2)]
+
+
+def test_align_by_overlap_matches_align():
+    source = Subtitles(get_text('test_data/partition2_en.srt'), 'eng')
+    target = Subtitles(get_text('test_data/partition2_es.srt'), 'spa', False)
+    expected = [str(pair) for pair in source.align(target)]
+
+    source = Subtitles(get_text('test_data/partition2_en.srt'), 'eng')
+    target = Subtitles(get_text('test_data/partition2_es.srt'), 'spa', False)
+    assert [str(pair) for pair in source.align_by_overlap(target)] == expected
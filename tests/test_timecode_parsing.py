@@ -0,0 +1,37 @@
+import pytest
+from src.helpers import get_text
+from src.subtitle import parse_timestring, parse_time_code_lines, _parse_time_codes
+from src.subtitles import Subtitles
+
+
+@pytest.fixture
+def lines():
+    return ['00:56:18,334 --> 00:56:20,001',
+            '00:00:17,767-->00:00:19,561',
+            '00:00:19,561 00:00:24,899',
+            '1:00:00,000 --> 1:00:01,000']
+
+
+def test_parse_timestring():
+    assert parse_timestring('00:56:18,334') == 3378334000
+    assert parse_timestring('00:00:10,000', '00:00:01,500') == 11500000
+    assert parse_timestring('00:00:10,000', '00:00:01,500', offset_is_negative=True) == 8500000
+
+
+def test_parse_time_codes_falls_back_to_regex(lines):
+    assert _parse_time_codes(lines[0]) == (3378334000, 3380001000, lines[0])
+    assert _parse_time_codes(lines[1]) == (17767000, 19561000, '00:00:17,767 --> 00:00:19,561')
+    assert _parse_time_codes(lines[2]) == (19561000, 24899000, '00:00:19,561 --> 00:00:24,899')
+
+
+def test_parse_time_code_lines_matches_scalar_parser(lines):
+    starts, ends = parse_time_code_lines(lines)
+    assert starts[0] == 3378334000 and ends[0] == 3380001000
+    # Anything outside the fixed layout is left for _parse_time_codes
+    assert list(starts[1:]) == [-1, -1, -1]
+
+
+def test_subtitles_use_parsed_time_codes():
+    subs = Subtitles(get_text('test_data/timecode_strings.srt'), 'eng')
+    for sub in subs:
+        assert (sub.start, sub.end, sub.timestring) == _parse_time_codes(sub.lines.split('\n')[1])
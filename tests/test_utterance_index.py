@@ -0,0 +1,45 @@
+import pytest
+from src.subtitle import Subtitle
+from src.utterance import Utterance
+from src.utterance_index import UtteranceIndex
+
+
+def _utterance(index, timestring):
+    return Utterance(f'Line {index}.', [Subtitle(f'{index}\n{timestring}\nLine {index}.', 'eng')])
+
+
+@pytest.fixture
+def utterances():
+    # The third subtitle is out of order, as happens in real SRT files
+    return [_utterance(1, '00:00:01,000 --> 00:00:03,000'),
+            _utterance(2, '00:00:02,000 --> 00:00:06,000'),
+            _utterance(3, '00:00:00,500 --> 00:00:01,500'),
+            _utterance(4, '00:00:07,000 --> 00:00:08,000'),
+            _utterance(5, '00:00:09,000 --> 00:00:10,000')]
+
+
+def _walk(utterances, start, end):
+    options = []
+    for current in utterances:
+        if current.end() < start:
+            continue
+        elif current.start() > end:
+            break
+        else:
+            options.append(current)
+    return options
+
+
+def test_find_matches_walk(utterances):
+    index = UtteranceIndex(utterances)
+    for start in range(0, 11000000, 250000):
+        for length in [0, 500000, 2000000]:
+            assert index.find(start, start + length) == _walk(utterances, start, start + length)
+
+
+def test_find_by_time_matches_filter(utterances):
+    index = UtteranceIndex(utterances)
+    for start in range(0, 11000000, 250000):
+        for length in [0, 500000, 2000000]:
+            end = start + length
+            assert index.find_by_time(start, end) == [u for u in utterances if u.end() >= start and u.start() <= end]
@@ -0,0 +1,42 @@
+import pytest
+from src.alignment import Alignment
+from src.subtitle import Subtitle
+from src.utterance import Utterance
+
+
+@pytest.fixture
+def subtitles():
+    return [Subtitle('756\n00:45:32,000 --> 00:45:34,000\nIt will look like a...', 'eng'),
+            Subtitle('757\n00:45:34,000 --> 00:45:37,000\nheart attack or car accident.', 'eng'),
+            Subtitle('758\n00:45:38,000 --> 00:45:40,000\nHere is a list.', 'eng')]
+
+
+def test_span_follows_append_and_merge(subtitles):
+    utterance = Utterance('It will look like a...', [subtitles[0]])
+    assert (utterance.start(), utterance.end()) == (subtitles[0].start, subtitles[0].end)
+
+    utterance.append(subtitles[1])
+    assert (utterance.start(), utterance.end()) == (subtitles[0].start, subtitles[1].end)
+
+    other = Utterance('Here is a list.', [subtitles[2]])
+    other.start()
+    utterance.merge(other)
+    assert (utterance.start(), utterance.end()) == (subtitles[0].start, subtitles[2].end)
+
+
+def test_span_is_invalidated_by_delaying_timecodes(subtitles):
+    utterance = Utterance('It will look like a... heart attack or car accident.', subtitles[:2])
+    start, end = utterance.start(), utterance.end()
+    for subtitle in subtitles[:2]:
+        subtitle.delay_timecodes(1000000)
+    assert (utterance.start(), utterance.end()) == (start + 1000000, end + 1000000)
+
+
+def test_alignment_span(subtitles):
+    alignment = Alignment('source', 'target')
+    alignment.source_subs = subtitles[:1]
+    alignment.target_subs = subtitles[1:2]
+    assert (alignment.start(), alignment.end()) == (subtitles[0].start, subtitles[1].end)
+
+    alignment.target_subs = subtitles[2:]
+    assert alignment.end() == subtitles[2].end